@@ -0,0 +1,90 @@
+"""
+Serialize turbo stream actions with many attributes
+
+python benchmarks/bench_attributes.py
+"""
+import timeit
+
+import django
+from django.conf import settings
+
+settings.configure(SECRET_KEY="benchmark", INSTALLED_APPS=["turbo_helper"])
+django.setup()
+
+from turbo_helper import turbo_stream  # noqa: E402
+
+EXTRA_ATTRIBUTES = {
+    "data_controller": "toast",
+    "data_action": "click->toast#close",
+    "data_toast_delay_value": 3000,
+    "data_toast_dismissible_value": True,
+    "data_turbo_temporary": "",
+    "aria_live": "polite",
+    "request_id": "ca519ab9-1138-4625-abc2-6049317321a9",
+    "class_name": "toast toast--info",
+    "tab_index": -1,
+    "title": "Saved <draft>",
+}
+
+
+def redirect_to():
+    return turbo_stream.redirect_to(
+        "/projects/42/", turbo_action="replace", turbo_frame="main", **EXTRA_ATTRIBUTES
+    )
+
+
+def dispatch_event():
+    return turbo_stream.dispatch_event(
+        targets="#project",
+        name="project:saved",
+        detail={"id": 42, "tags": ["a", "b"]},
+        **EXTRA_ATTRIBUTES,
+    )
+
+
+def update():
+    return turbo_stream.update("project_42", "<p>Saved</p>", **EXTRA_ATTRIBUTES)
+
+
+KEYS = list(EXTRA_ATTRIBUTES)
+# values as turbo_power renders them, bool and dict values are passed to the handler
+VALUES = tuple(
+    str(value).lower() if type(value) is bool else value
+    for value in EXTRA_ATTRIBUTES.values()
+)
+
+compiled_redirect_to = turbo_stream.compile(
+    "redirect_to", keys=["url", "turbo_action", "turbo_frame", *KEYS]
+)
+compiled_dispatch_event = turbo_stream.compile(
+    "dispatch_event",
+    keys=["name", *KEYS],
+    targets=True,
+    detail={"id": 42, "tags": ["a", "b"]},
+)
+
+
+def compiled_redirect():
+    return compiled_redirect_to(None, "/projects/42/", "replace", "main", *VALUES)
+
+
+def compiled_dispatch():
+    return compiled_dispatch_event("#project", "project:saved", *VALUES)
+
+
+def main(number=20000):
+    for func in (
+        redirect_to,
+        compiled_redirect,
+        dispatch_event,
+        compiled_dispatch,
+        update,
+    ):
+        seconds = timeit.timeit(func, number=number)
+        print(  # noqa: T201
+            f"{func.__name__:<18} {seconds / number * 1000000:.2f} us per action"
+        )
+
+
+if __name__ == "__main__":
+    main()
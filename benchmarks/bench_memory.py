@@ -0,0 +1,98 @@
+"""
+Memory of long-lived subscriptions, each simulated connection subscribes to one
+of a few streams through TurboStreamCableConsumer on InMemoryChannelLayer
+
+python benchmarks/bench_memory.py
+"""
+import asyncio
+import gc
+import json
+import tracemalloc
+
+import django
+from django.conf import settings
+
+settings.configure(
+    SECRET_KEY="benchmark",
+    INSTALLED_APPS=["turbo_helper", "channels"],
+    CHANNEL_LAYERS={"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}},
+)
+django.setup()
+
+from channels.layers import get_channel_layer  # noqa: E402
+
+from turbo_helper.channels.consumer import TurboStreamCableConsumer  # noqa: E402
+from turbo_helper.channels.stream_name import generate_signed_stream_key  # noqa: E402
+from turbo_helper.channels.streams_channel import TurboStreamCableChannel  # noqa: E402
+
+STREAMS = 10
+
+
+async def subscribe(channel_layer, signed_stream_name):
+    consumer = TurboStreamCableConsumer()
+    consumer.channel_layer = channel_layer
+    consumer.channel_name = await channel_layer.new_channel()
+
+    # the identifier is decoded from the client message of each connection
+    params = json.loads(
+        json.dumps(
+            {
+                "channel": "TurboStreamCableChannel",
+                "signed_stream_name": signed_stream_name,
+            }
+        )
+    )
+    identifier_key = json.dumps(params, sort_keys=True)
+    channel = TurboStreamCableChannel(consumer, identifier_key, params)
+    consumer.identifier_to_channel_instance_map[identifier_key] = channel
+    await channel.subscribe()
+    # same as TurboStreamCableConsumer after confirm_subscription
+    await channel.replay()
+    return consumer, channel
+
+
+async def main(count=20000):
+    channel_layer = get_channel_layer()
+    signed_stream_names = [
+        generate_signed_stream_key(f"chat_{i}") for i in range(STREAMS)
+    ]
+
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+
+    subscriptions = [
+        await subscribe(channel_layer, signed_stream_names[i % STREAMS])
+        for i in range(count)
+    ]
+
+    gc.collect()
+    after = tracemalloc.take_snapshot()
+    size = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    print(  # noqa: T201
+        f"{count} subscriptions: {size / count:.0f} bytes per subscription"
+    )
+
+    channel = subscriptions[0][1]
+    print(f"TurboStreamCableChannel: {sizeof(channel)} bytes")  # noqa: T201
+
+
+def sizeof(obj):
+    """
+    The object and its attributes which are not shared with other subscriptions
+    """
+    size = obj.__sizeof__()
+    names = getattr(type(obj), "__slots__", None)
+    if names is None:
+        # reading __dict__ of an object with __slots__ would create it
+        size += obj.__dict__.__sizeof__()
+        names = vars(obj)
+    for name in names:
+        value = getattr(obj, name, None)
+        if isinstance(value, (list, dict, tuple)):
+            size += value.__sizeof__()
+    return size
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
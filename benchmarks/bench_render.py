@@ -0,0 +1,50 @@
+"""
+Compare Django and Jinja2 rendering of a large turbo stream response
+
+python benchmarks/bench_render.py
+"""
+import timeit
+
+import django
+from django.conf import settings
+
+settings.configure(
+    SECRET_KEY="benchmark",
+    INSTALLED_APPS=["turbo_helper"],
+    TEMPLATES=[
+        {"BACKEND": "django.template.backends.django.DjangoTemplates"},
+        {
+            "BACKEND": "django.template.backends.jinja2.Jinja2",
+            "OPTIONS": {"extensions": ["turbo_helper.jinja2.TurboHelperExtension"]},
+        },
+    ],
+)
+django.setup()
+
+from django.template import engines  # noqa: E402
+
+DJANGO_TEMPLATE = """{% load turbo_helper %}{% for item in items %}
+{% turbo_stream "replace" item.dom_id method="morph" %}<div class="item">{{ item.name }}</div>{% endturbo_stream %}
+{% endfor %}"""
+
+JINJA2_TEMPLATE = """{% for item in items %}
+{% turbo_stream "replace", item.dom_id, method="morph" %}<div class="item">{{ item.name }}</div>{% endturbo_stream %}
+{% endfor %}"""
+
+
+def main(count=1000, number=20):
+    context = {
+        "items": [{"dom_id": f"item_{i}", "name": f"Item <{i}>"} for i in range(count)]
+    }
+    django_template = engines["django"].from_string(DJANGO_TEMPLATE)
+    jinja2_template = engines["jinja2"].from_string(JINJA2_TEMPLATE)
+
+    for name, template in (("django", django_template), ("jinja2", jinja2_template)):
+        seconds = timeit.timeit(lambda t=template: t.render(context), number=number)
+        print(  # noqa: T201
+            f"{name:<8} {count} actions: {seconds / number * 1000:.2f} ms per render"
+        )
+
+
+if __name__ == "__main__":
+    main()
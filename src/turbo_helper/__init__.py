@@ -1,9 +1,22 @@
 from template_simplify import dom_id
 
+from .broadcastable import broadcasts_refreshes, broadcasts_refreshes_to, broadcasts_to
+from .decorators import turbo_frame_condition
 from .middleware import get_current_request
-from .response import HttpResponseSeeOther, TurboStreamResponse
+from .response import (
+    HttpResponseSeeOther,
+    TurboStreamResponse,
+    TurboStreamStreamingResponse,
+)
 from .shortcuts import redirect_303, respond_to
-from .signals import after_create_commit, after_delete_commit, after_update_commit
+from .signals import (
+    after_bulk_create_commit,
+    after_bulk_delete_commit,
+    after_bulk_update_commit,
+    after_create_commit,
+    after_delete_commit,
+    after_update_commit,
+)
 from .stream import register_turbo_stream_action, turbo_stream
 
 # extend turbo_stream actions, inspired by https://github.com/marcoroth/turbo_power
@@ -13,6 +26,7 @@ __all__ = [
     "turbo_stream",
     "register_turbo_stream_action",
     "TurboStreamResponse",
+    "TurboStreamStreamingResponse",
     "HttpResponseSeeOther",
     "redirect_303",
     "dom_id",
@@ -21,4 +35,11 @@ __all__ = [
     "after_create_commit",
     "after_update_commit",
     "after_delete_commit",
+    "after_bulk_create_commit",
+    "after_bulk_update_commit",
+    "after_bulk_delete_commit",
+    "broadcasts_to",
+    "broadcasts_refreshes_to",
+    "broadcasts_refreshes",
+    "turbo_frame_condition",
 ]
@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class TurboHelperConfig(AppConfig):
     name = "turbo_helper"
     verbose_name = "Turbo Helper"
+
+    def ready(self):
+        from .broadcastable import registry
+
+        # resolve template, target, stream builder of the models once
+        registry.resolve()
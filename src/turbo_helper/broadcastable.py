@@ -0,0 +1,269 @@
+"""
+Rails: Turbo::Broadcastable
+
+https://github.com/hotwired/turbo-rails/blob/main/app/models/concerns/turbo/broadcastable.rb
+"""
+from collections import defaultdict
+from operator import attrgetter
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+from django.db.models import Model
+from django.db.models.signals import post_delete, post_save
+from django.utils.text import camel_case_to_spaces
+
+from .middleware import get_current_request
+from .signals import registry as signal_registry
+
+Stream = Union[str, Callable[[Model], Any], None]
+
+
+class ModelBroadcasts:
+    """
+    Broadcast create, update and delete of a model
+
+    Template, target, stream builder and dom_id prefix are resolved once when the
+    app is ready, instead of on every save.
+
+    If `morph` is True, updates are sent as replace actions with `method="morph"`,
+    even when the model broadcasts refreshes.
+    """
+
+    def __init__(
+        self,
+        model,
+        stream: Stream = None,
+        inserts_by: str = "append",
+        target: Optional[str] = None,
+        template: Optional[str] = None,
+        refreshes: bool = False,
+        morph: bool = False,
+    ):
+        self.model = model
+        self.stream = stream
+        self.inserts_by = inserts_by
+        self.target = target
+        self.template = template
+        self.refreshes = refreshes
+        self.morph = morph
+
+    def resolve(self):
+        opts = self.model._meta
+        self.context_name = opts.model_name
+        self.template = self.template or f"{opts.app_label}/{opts.model_name}.html"
+        # Rails: model_name.plural, for example "todo_items", built from the class
+        # name instead of the translatable verbose_name_plural, so stream names and
+        # dom ids do not change with the active language
+        self.plural_name = (
+            camel_case_to_spaces(opts.object_name).replace(" ", "_") + "s"
+        )
+        self.target = self.target or self.plural_name
+
+        if self.stream is None:
+            self.stream_builder = None
+        elif callable(self.stream):
+            self.stream_builder = self.stream
+        else:
+            # attribute name, for example "chat"
+            self.stream_builder = attrgetter(self.stream)
+
+        # same as dom_id(instance) if the model does not have `to_key`
+        if hasattr(self.model, "to_key"):
+            self.dom_id_prefix = None
+        else:
+            self.dom_id_prefix = self.model.__name__.lower()
+
+        signal_registry.register(post_save, self.model, "create", self.after_create)
+        signal_registry.register(post_save, self.model, "update", self.after_update)
+        signal_registry.register(post_delete, self.model, "delete", self.after_delete)
+        signal_registry.register_bulk(self.model, "create", self.after_bulk_create)
+        signal_registry.register_bulk(self.model, "update", self.after_bulk_update)
+
+    def streamables_for(self, instance, created=False) -> Tuple[Any, ...]:
+        if self.stream_builder is None:
+            # Rails: broadcasts_refreshes
+            return (self.plural_name,) if created else (instance,)
+
+        streamables = self.stream_builder(instance)
+        if isinstance(streamables, (list, tuple)):
+            return tuple(streamables)
+        return (streamables,)
+
+    def dom_id(self, instance) -> str:
+        if self.dom_id_prefix:
+            return f"{self.dom_id_prefix}_{instance.pk}"
+
+        from .templatetags.turbo_helper import dom_id
+
+        return dom_id(instance)
+
+    def render(self, action, instance, created=False) -> str:
+        from .stream import MORPH_METHOD, turbo_stream
+
+        if action == "remove":
+            return turbo_stream.action("remove", self.dom_id(instance))
+
+        target = self.target if created else self.dom_id(instance)
+        attributes = {}
+        if action == "replace" and self.morph:
+            attributes["method"] = MORPH_METHOD
+        return turbo_stream.action(
+            action,
+            target,
+            template=self.template,
+            context={self.context_name: instance},
+            **attributes,
+        )
+
+    def refreshes_for(self, action) -> bool:
+        # morphing the updated element is cheaper than refreshing the whole page
+        return self.refreshes and not (self.morph and action == "replace")
+
+    def broadcast(self, action, instances, created=False):
+        """
+        Render all instances of the same stream into one message
+        """
+        from .channels.broadcasts import broadcast_stream_to
+        from .channels.stream_name import stream_name_from
+
+        refreshes = self.refreshes_for(action)
+        streams: Dict[str, Tuple[Tuple[Any, ...], List[str]]] = {}
+        for instance in instances:
+            streamables = self.streamables_for(instance, created=created)
+            stream_name = stream_name_from(*streamables)
+            if stream_name not in streams:
+                streams[stream_name] = (streamables, [])
+            if refreshes:
+                # one refresh is enough for each stream
+                continue
+            streams[stream_name][1].append(
+                self.render(action, instance, created=created)
+            )
+
+        for streamables, contents in streams.values():
+            if refreshes:
+                content = self.render_refresh()
+            else:
+                content = "".join(contents)
+            broadcast_stream_to(*streamables, content=content)
+
+    def render_refresh(self) -> str:
+        from .renderers import render_turbo_stream_refresh
+
+        request = get_current_request()
+        turbo = getattr(request, "turbo", None)
+        return render_turbo_stream_refresh(
+            request_id=turbo.request_id if turbo is not None else None
+        )
+
+    def after_create(self, sender, instance, **kwargs):
+        self.broadcast(self.inserts_by, [instance], created=True)
+
+    def after_update(self, sender, instance, **kwargs):
+        self.broadcast("replace", [instance])
+
+    def after_delete(self, sender, instance, **kwargs):
+        self.broadcast("remove", [instance])
+
+    def after_bulk_create(self, sender, instances, pks, **kwargs):
+        self.broadcast(self.inserts_by, instances, created=True)
+
+    def after_bulk_update(self, sender, instances, pks, **kwargs):
+        if instances is None:
+            # QuerySet.update
+            instances = self.model._default_manager.filter(pk__in=pks)
+        self.broadcast("replace", instances)
+
+
+class ModelBroadcastsRegistry:
+    def __init__(self):
+        self.model_broadcasts: Dict[Any, List[ModelBroadcasts]] = defaultdict(list)
+        self.ready = False
+
+    def register(self, model_broadcasts: ModelBroadcasts):
+        self.model_broadcasts[model_broadcasts.model].append(model_broadcasts)
+        if self.ready:
+            model_broadcasts.resolve()
+
+    def resolve(self):
+        """
+        Called when the app is ready
+        """
+        for items in self.model_broadcasts.values():
+            for model_broadcasts in items:
+                model_broadcasts.resolve()
+        self.ready = True
+
+
+registry = ModelBroadcastsRegistry()
+
+
+def broadcasts_to(
+    stream: Stream,
+    inserts_by: str = "append",
+    target: Optional[str] = None,
+    template: Optional[str] = None,
+    morph: bool = False,
+):
+    """
+    Rails: broadcasts_to
+
+    @broadcasts_to(lambda message: [message.chat, "messages"], inserts_by="prepend")
+    class Message(models.Model):
+        ...
+
+    1. create: `inserts_by` action with `template` to `target`
+    2. update: replace action with `template` to `dom_id(instance)`,
+       with `method="morph"` if `morph` is True
+    3. delete: remove action to `dom_id(instance)`
+    """
+
+    def decorator(model):
+        registry.register(
+            ModelBroadcasts(
+                model,
+                stream=stream,
+                inserts_by=inserts_by,
+                target=target,
+                template=template,
+                morph=morph,
+            )
+        )
+        return model
+
+    return decorator
+
+
+def broadcasts_refreshes_to(stream: Stream, morph: bool = False):
+    """
+    Rails: broadcasts_refreshes_to
+
+    Broadcast refresh to the stream when the instance is created, updated or deleted
+
+    If `morph` is True, updates are sent as replace actions with `method="morph"`
+    which render the model template, instead of refreshing the whole page
+    """
+
+    def decorator(model):
+        registry.register(
+            ModelBroadcasts(model, stream=stream, refreshes=True, morph=morph)
+        )
+        return model
+
+    return decorator
+
+
+def broadcasts_refreshes(morph: bool = False):
+    """
+    Rails: broadcasts_refreshes
+
+    Broadcast refresh to the instance stream when it is updated or deleted,
+    and to the plural model name stream when it is created
+
+    `morph` is the same as broadcasts_refreshes_to
+    """
+
+    def decorator(model):
+        registry.register(ModelBroadcasts(model, refreshes=True, morph=morph))
+        return model
+
+    return decorator
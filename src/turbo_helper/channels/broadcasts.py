@@ -1,10 +1,20 @@
+import asyncio
+
 from actioncable import cable_broadcast
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
 from django.template.loader import render_to_string
 
 from turbo_helper.renderers import render_turbo_stream_refresh
-from turbo_helper.stream import action_proxy
+from turbo_helper.stream import action_proxy, turbo_stream
 
-from .stream_name import stream_name_from
+from .diff import DIFF_ACTIONS, get_broadcast_differ
+from .replay import get_replay_buffer
+from .stream_name import (
+    prefix_group_names_from,
+    shard_group_names_from,
+    stream_name_from,
+)
 
 
 def broadcast_render_to(*streamables, **kwargs):
@@ -29,12 +39,16 @@ def broadcast_render_to(*streamables, **kwargs):
     )
     """
     template = kwargs.pop("template", None)
-    broadcast_stream_to(
-        *streamables, content=render_to_string(template_name=template, **kwargs)
-    )
+    if "using" in kwargs:
+        content = render_to_string(template_name=template, **kwargs)
+    else:
+        content = turbo_stream.render_template(template, **kwargs)
+    broadcast_stream_to(*streamables, content=content)
 
 
-def broadcast_action_to(*streamables, action, target=None, targets=None, **kwargs):
+def broadcast_action_to(
+    *streamables, action, target=None, targets=None, diff=False, **kwargs
+):
     """
     For now, we do not support:
 
@@ -49,7 +63,27 @@ def broadcast_action_to(*streamables, action, target=None, targets=None, **kwarg
 
     # remove DOM which has id="new_task"
     broadcast_action_to("tasks", action="remove", target="new_task")
+
+    If `diff` is True, replace and update of a `target` are compared with the last
+    broadcast to the same stream and target, nothing is sent if the HTML is the same,
+    and only the changed nested elements are updated if possible.
     """
+    if diff and target and action in DIFF_ACTIONS:
+        content = kwargs.pop("content", None)
+        template = kwargs.pop("template", None)
+        if content is None and template:
+            content = turbo_stream.render_template(
+                template,
+                context=kwargs.pop("context", None),
+                request=kwargs.pop("request", None),
+            )
+        content = get_broadcast_differ().diff(
+            stream_name_from(*streamables), action, target, content, **kwargs
+        )
+        if content:
+            broadcast_stream_to(*streamables, content=content)
+        return
+
     content = action_proxy(
         action,
         target=target,
@@ -64,9 +98,52 @@ def broadcast_refresh_to(*streamables, request, **kwargs):
     broadcast_stream_to(*streamables, content=content)
 
 
+async def group_send_all(group_names, message, sequence=None):
+    """
+    Send the message to the groups in parallel, each event has its own group name,
+    so the consumer can find the subscriptions of the group
+    """
+    channel_layer = get_channel_layer()
+
+    def event_of(group_name):
+        event = {
+            "type": "action_cable_message",
+            "group": group_name,
+            "message": message,
+        }
+        if sequence is not None:
+            event["sequence"] = sequence
+        return event
+
+    await asyncio.gather(
+        *[
+            channel_layer.group_send(group_name, event_of(group_name))
+            for group_name in group_names
+        ]
+    )
+
+
 def broadcast_stream_to(*streamables, content):
     stream_name = stream_name_from(*streamables)
-    cable_broadcast(
-        group_name=stream_name,
-        message=content,
-    )
+    # more than one group if the stream is sharded
+    group_names = shard_group_names_from(stream_name)
+
+    replay_buffer = get_replay_buffer()
+    if replay_buffer and replay_buffer.handles(stream_name):
+        # attach sequence number, so the client can resume from it after reconnect
+        sequence = replay_buffer.append(stream_name, content)
+        async_to_sync(group_send_all)(group_names, content, sequence=sequence)
+    elif len(group_names) > 1:
+        async_to_sync(group_send_all)(group_names, content)
+    else:
+        cable_broadcast(
+            group_name=stream_name,
+            message=content,
+        )
+
+    # subscribers of the stream prefixes, for example "project_42_*"
+    for group_name in prefix_group_names_from(*streamables):
+        cable_broadcast(
+            group_name=group_name,
+            message=content,
+        )
@@ -0,0 +1,101 @@
+import asyncio
+import json
+import logging
+
+from actioncable import ActionCableConsumer
+
+LOGGER = logging.getLogger(__name__)
+
+
+class TurboStreamCableConsumer(ActionCableConsumer):
+    """
+    Let the cable channel decide how to send the group message to the client,
+    instead of sending it directly.
+    """
+
+    async def receive_json(self, content, **kwargs):
+        await super().receive_json(content, **kwargs)
+        if content.get("command") == "subscribe":
+            # send the missed messages after confirm_subscription, like Rails,
+            # messages of a subscription come after it is confirmed
+            identifier_key = await self.encode_json(json.loads(content["identifier"]))
+            cable_channel_instance = self.identifier_to_channel_instance_map.get(
+                identifier_key
+            )
+            if hasattr(cable_channel_instance, "replay"):
+                await cable_channel_instance.replay()
+
+    async def disconnect(self, close_code):
+        await super().disconnect(close_code)
+        # leave the groups and stop pending sends
+        for cable_channel_instance in list(
+            self.identifier_to_channel_instance_map.values()
+        ):
+            await cable_channel_instance.unsubscribe()
+
+    async def subscribe_groups(self, group_names, cable_channel_instance):
+        """
+        Join many groups in one batch
+        """
+        await asyncio.gather(
+            *[
+                self.channel_layer.group_add(group_name, self.channel_name)
+                for group_name in group_names
+            ]
+        )
+        for group_name in group_names:
+            self.group_channel_instance_map[group_name].add(
+                cable_channel_instance.identifier_key
+            )
+
+    async def unsubscribe_groups(self, group_names, cable_channel_instance):
+        """
+        Leave many groups in one batch
+        """
+        discard_group_names = []
+        for group_name in group_names:
+            subscribed_channel_instance_keys = self.group_channel_instance_map.get(
+                group_name, set()
+            )
+            subscribed_channel_instance_keys.discard(
+                cable_channel_instance.identifier_key
+            )
+            if not subscribed_channel_instance_keys:
+                # no other cable channel subscribe to this group
+                self.group_channel_instance_map.pop(group_name, None)
+                discard_group_names.append(group_name)
+
+        await asyncio.gather(
+            *[
+                self.channel_layer.group_discard(group_name, self.channel_name)
+                for group_name in discard_group_names
+            ]
+        )
+        self.identifier_to_channel_instance_map.pop(
+            cable_channel_instance.identifier_key, None
+        )
+
+    async def action_cable_message(self, event):
+        group_name = event["group"]
+
+        if group_name not in self.group_channel_instance_map:
+            LOGGER.warning(
+                "Group name %s not found in group_channel_instance_map", group_name
+            )
+            return
+
+        for channel_instance_unique_key in list(
+            self.group_channel_instance_map[group_name]
+        ):
+            cable_channel_instance = self.identifier_to_channel_instance_map[
+                channel_instance_unique_key
+            ]
+            if hasattr(cable_channel_instance, "receive_broadcast"):
+                await cable_channel_instance.receive_broadcast(event)
+            else:
+                await self.send_json(
+                    {
+                        "identifier": cable_channel_instance.identifier_key,
+                        "message": event["message"],
+                    }
+                )
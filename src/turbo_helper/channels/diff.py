@@ -0,0 +1,202 @@
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from html.parser import HTMLParser
+from typing import List, Optional, Tuple
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.utils.html import conditional_escape
+from django.utils.safestring import SafeString
+
+from turbo_helper.stream import MORPH_METHOD, turbo_stream
+
+# actions which can be narrowed to `update` of the nested elements
+DIFF_ACTIONS = ("replace", "update")
+
+VOID_ELEMENTS = {
+    "area",
+    "base",
+    "br",
+    "col",
+    "embed",
+    "hr",
+    "img",
+    "input",
+    "link",
+    "meta",
+    "source",
+    "track",
+    "wbr",
+}
+
+
+class IdNode:
+    """
+    Element which has `id`, `start` and `end` are the offsets of its inner HTML
+    """
+
+    __slots__ = ("id", "start", "end", "children")
+
+    def __init__(self, id, start):
+        self.id = id
+        self.start = start
+        self.end = start
+        self.children: List["IdNode"] = []
+
+
+class IdTreeParser(HTMLParser):
+    def __init__(self, html):
+        super().__init__(convert_charrefs=False)
+        self.html = html
+        # getpos() returns (line, column), lines are only split by "\n"
+        self.line_offsets = [0]
+        for line in html.split("\n"):
+            self.line_offsets.append(self.line_offsets[-1] + len(line) + 1)
+        self.root = IdNode(None, 0)
+        # (tag, IdNode or None)
+        self.stack: List[Tuple[str, Optional[IdNode]]] = []
+
+    def position(self):
+        line, column = self.getpos()
+        return self.line_offsets[line - 1] + column
+
+    def parent(self):
+        for _tag, node in reversed(self.stack):
+            if node is not None:
+                return node
+        return self.root
+
+    def handle_starttag(self, tag, attrs):
+        if tag in VOID_ELEMENTS:
+            return
+        element_id = dict(attrs).get("id")
+        node = None
+        if element_id:
+            start_tag = self.get_starttag_text() or ""
+            node = IdNode(element_id, self.position() + len(start_tag))
+            self.parent().children.append(node)
+        self.stack.append((tag, node))
+
+    def handle_endtag(self, tag):
+        for index in range(len(self.stack) - 1, -1, -1):
+            if self.stack[index][0] == tag:
+                node = self.stack[index][1]
+                if node is not None:
+                    node.end = self.position()
+                del self.stack[index:]
+                return
+
+
+def parse_id_tree(html) -> IdNode:
+    parser = IdTreeParser(html)
+    parser.feed(html)
+    parser.close()
+    parser.root.end = len(html)
+    return parser.root
+
+
+def mask(html, node: IdNode) -> str:
+    """
+    Inner HTML of the node, with inner HTML of its children removed
+    """
+    parts = []
+    position = node.start
+    for child in node.children:
+        parts.append(html[position : child.start])
+        position = child.end
+    parts.append(html[position : node.end])
+    return "\0".join(parts)
+
+
+def changed_regions(
+    old_html, new_html, old_node: IdNode, new_node: IdNode
+) -> Optional[List[Tuple[str, str]]]:
+    """
+    Return (id, new inner HTML) of the innermost elements which explain all changes,
+    None if there are changes outside of them.
+    """
+    if [child.id for child in old_node.children] != [
+        child.id for child in new_node.children
+    ]:
+        return None
+    if mask(old_html, old_node) != mask(new_html, new_node):
+        return None
+
+    regions = []
+    for old_child, new_child in zip(old_node.children, new_node.children, strict=True):
+        new_inner = new_html[new_child.start : new_child.end]
+        if old_html[old_child.start : old_child.end] == new_inner:
+            continue
+        nested = changed_regions(old_html, new_html, old_child, new_child)
+        if nested is None:
+            regions.append((new_child.id, new_inner))
+        else:
+            regions.extend(nested)
+    return regions
+
+
+class BroadcastDiffer:
+    """
+    Keep the last rendered HTML for each (stream, target) in a bounded cache,
+    so a broadcast can be skipped when nothing changed, or narrowed to `update`
+    actions on the nested elements (which have `id`) that changed.
+
+    The cache is local to the process.
+    """
+
+    def __init__(self, max_size: int = 1000):
+        self.max_size = max_size
+        self.lock = threading.Lock()
+        self.cache: OrderedDict = OrderedDict()
+
+    def remember(self, key, value):
+        with self.lock:
+            previous = self.cache.pop(key, None)
+            self.cache[key] = value
+            if len(self.cache) > self.max_size:
+                self.cache.popitem(last=False)
+        return previous
+
+    def diff(self, stream_name, action, target, content, **attributes) -> str:
+        """
+        Return the message to broadcast, empty string if nothing changed
+        """
+        html = conditional_escape(content or "")
+        value = (action, html, tuple(sorted(attributes.items())))
+        previous = self.remember((stream_name, target), value)
+
+        if previous == value:
+            return ""
+
+        full = turbo_stream.action(action, target, html, **attributes)
+        if previous is None or previous[0] != action or previous[2] != value[2]:
+            return full
+
+        old_html = previous[1]
+        regions = changed_regions(
+            old_html, html, parse_id_tree(old_html), parse_id_tree(html)
+        )
+        if regions is None:
+            # let Turbo morph the element instead of replacing it
+            attributes.setdefault("method", MORPH_METHOD)
+            return turbo_stream.action(action, target, html, **attributes)
+
+        narrow = "".join(
+            turbo_stream.update(element_id, SafeString(inner))
+            for element_id, inner in regions
+        )
+        return narrow if len(narrow) < len(full) else full
+
+
+@lru_cache(maxsize=None)
+def get_broadcast_differ() -> BroadcastDiffer:
+    return BroadcastDiffer(getattr(settings, "TURBO_HELPER_DIFF_CACHE_SIZE", 1000))
+
+
+def _reset_broadcast_differ(setting, **kwargs):
+    if setting == "TURBO_HELPER_DIFF_CACHE_SIZE":
+        get_broadcast_differ.cache_clear()
+
+
+setting_changed.connect(_reset_broadcast_differ)
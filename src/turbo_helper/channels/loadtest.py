@@ -0,0 +1,210 @@
+"""
+Load test of broadcast fan-out, N simulated Action Cable subscribers receive
+broadcasts through TurboStreamCableChannel on InMemoryChannelLayer
+
+python manage.py turbo_helper_loadtest --subscribers 10000 --broadcasts 20
+"""
+import asyncio
+import gc
+import json
+import re
+import statistics
+import time
+import tracemalloc
+from dataclasses import dataclass
+from typing import Dict, List
+
+from asgiref.sync import sync_to_async
+from channels.layers import InMemoryChannelLayer, get_channel_layer
+from django.test.utils import override_settings
+
+from .broadcasts import broadcast_stream_to
+from .consumer import TurboStreamCableConsumer
+from .stream_name import generate_signed_stream_key
+from .streams_channel import TurboStreamCableChannel
+
+# broadcasts are told apart by data-id, a frame can have many of them when the
+# outbound buffer merges messages, and data-sequence is added with the replay buffer
+MESSAGE_ID_RE = re.compile(r'data-id="(\d+)"')
+
+
+class LoadTestChannelLayer(InMemoryChannelLayer):
+    """
+    InMemoryChannelLayer checks all channels for expired messages on every receive,
+    which is O(subscribers) and would dominate the result, messages do not expire
+    during a load test.
+    """
+
+    def _clean_expired(self):
+        pass
+
+
+IN_MEMORY_CHANNEL_LAYERS = {
+    "default": {
+        "BACKEND": "turbo_helper.channels.loadtest.LoadTestChannelLayer",
+        "CONFIG": {"capacity": 1000},
+    },
+}
+
+
+@dataclass
+class LoadTestResult:
+    subscribers: int
+    broadcasts: int
+    expected: int
+    delivered: int
+    # seconds from calling broadcast_stream_to to the frame sent to the client
+    latencies: List[float]
+    duration: float
+    bytes_per_subscriber: float
+
+    @property
+    def throughput(self) -> float:
+        return self.delivered / self.duration if self.duration else 0
+
+    def percentile(self, percent) -> float:
+        if not self.latencies:
+            return 0
+        if len(self.latencies) == 1:
+            return self.latencies[0]
+        return statistics.quantiles(self.latencies, n=100, method="inclusive")[
+            percent - 1
+        ]
+
+    def report(self) -> str:
+        return "\n".join(
+            [
+                f"subscribers:  {self.subscribers}",
+                f"broadcasts:   {self.broadcasts}",
+                f"delivered:    {self.delivered}/{self.expected}",
+                f"throughput:   {self.throughput:.0f} messages/s",
+                f"latency p50:  {self.percentile(50) * 1000:.2f} ms",
+                f"latency p95:  {self.percentile(95) * 1000:.2f} ms",
+                f"latency p99:  {self.percentile(99) * 1000:.2f} ms",
+                f"latency max:  {max(self.latencies, default=0) * 1000:.2f} ms",
+                f"memory:       {self.bytes_per_subscriber:.0f} bytes per subscriber",
+            ]
+        )
+
+
+class SimulatedConnection:
+    """
+    TurboStreamCableConsumer without the websocket, frames sent to the client
+    are recorded as (time sent, data-id) for each broadcast in them
+    """
+
+    def __init__(self, channel_layer, received):
+        self.consumer = TurboStreamCableConsumer()
+        self.consumer.channel_layer = channel_layer
+        self.consumer.base_send = self.base_send
+        self.received = received
+        self.task = None
+
+    async def base_send(self, message):
+        received_time = time.perf_counter()
+        content = json.loads(message["text"]).get("message")
+        if isinstance(content, str):
+            for message_id in MESSAGE_ID_RE.findall(content):
+                self.received.append((received_time, message_id))
+
+    async def subscribe(self, signed_stream_name):
+        consumer = self.consumer
+        consumer.channel_name = await consumer.channel_layer.new_channel()
+
+        params = {
+            "channel": TurboStreamCableChannel.__name__,
+            "signed_stream_name": signed_stream_name,
+        }
+        identifier_key = json.dumps(params, sort_keys=True)
+        channel = TurboStreamCableChannel(consumer, identifier_key, params)
+        consumer.identifier_to_channel_instance_map[identifier_key] = channel
+        await channel.subscribe()
+        # same as TurboStreamCableConsumer after confirm_subscription
+        await channel.replay()
+        self.task = asyncio.create_task(self.receive_loop())
+
+    async def receive_loop(self):
+        # same as the channel layer listener of channels consumers
+        consumer = self.consumer
+        while True:
+            message = await consumer.channel_layer.receive(consumer.channel_name)
+            await consumer.dispatch(message)
+
+
+async def run_load_test(
+    subscribers=1000, streams=1, broadcasts=10, rate=10.0, timeout=30.0, relay=None
+) -> LoadTestResult:
+    """
+    `subscribers` are spread over `streams`, `rate` is broadcasts per second,
+    `relay` overrides TURBO_HELPER_CABLE_RELAY if it is not None
+    """
+    overrides = {"CHANNEL_LAYERS": IN_MEMORY_CHANNEL_LAYERS}
+    if relay is not None:
+        overrides["TURBO_HELPER_CABLE_RELAY"] = relay
+
+    with override_settings(**overrides):
+        channel_layer = get_channel_layer()
+        stream_names = [f"loadtest_{i}" for i in range(streams)]
+        signed_stream_names = [
+            generate_signed_stream_key(stream_name) for stream_name in stream_names
+        ]
+
+        received: List = []
+        gc.collect()
+        tracemalloc.start()
+        try:
+            before = tracemalloc.take_snapshot()
+            connections = []
+            for i in range(subscribers):
+                connection = SimulatedConnection(channel_layer, received)
+                await connection.subscribe(signed_stream_names[i % streams])
+                connections.append(connection)
+            # let the receive loops start, each consumer listens on its channel
+            await asyncio.sleep(0)
+            gc.collect()
+            after = tracemalloc.take_snapshot()
+        finally:
+            tracemalloc.stop()
+        memory = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+
+        # subscribers of each stream
+        counts = [len(range(i, subscribers, streams)) for i in range(streams)]
+        expected = sum(counts[i % streams] for i in range(broadcasts))
+
+        sent_times: Dict[str, float] = {}
+        start = time.perf_counter()
+        for i in range(broadcasts):
+            # append, so the outbound buffer does not drop earlier ones
+            content = f'<turbo-stream action="append" target="loadtest" data-id="{i}"><template></template></turbo-stream>'
+            sent_times[str(i)] = time.perf_counter()
+            await sync_to_async(broadcast_stream_to)(
+                stream_names[i % streams], content=content
+            )
+            if rate:
+                await asyncio.sleep(
+                    max(0, start + (i + 1) / rate - time.perf_counter())
+                )
+
+        deadline = time.perf_counter() + timeout
+        while len(received) < expected and time.perf_counter() < deadline:
+            await asyncio.sleep(0.01)
+        duration = time.perf_counter() - start
+
+        for connection in connections:
+            connection.task.cancel()
+        await asyncio.gather(
+            *[connection.task for connection in connections], return_exceptions=True
+        )
+
+    latencies = sorted(
+        received_time - sent_times[message_id] for received_time, message_id in received
+    )
+    return LoadTestResult(
+        subscribers=subscribers,
+        broadcasts=broadcasts,
+        expected=expected,
+        delivered=len(received),
+        latencies=latencies,
+        duration=duration,
+        bytes_per_subscriber=memory / subscribers if subscribers else 0,
+    )
@@ -0,0 +1,86 @@
+import re
+from typing import Any, List, Optional, Tuple
+
+from turbo_helper.renderers import render_turbo_stream_refresh
+
+# match the opening tag of the turbo stream element, the attributes can be in any order
+TURBO_STREAM_TAG_RE = re.compile(r"\s*<turbo-stream(?P<attributes>(?:\s[^>]*)?)>")
+ATTRIBUTE_RE = re.compile(r'\s(?P<name>[\w-]+)="(?P<value>[^"]*)"')
+
+# action -> earlier actions on the same target which have no effect after it
+SUPERSEDED_ACTIONS = {
+    "replace": ("replace", "update"),
+    "update": ("update",),
+}
+
+
+def parse_turbo_stream_action(message) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Return action and target if the message is a single turbo stream element
+    """
+    if not isinstance(message, str) or message.count("<turbo-stream") != 1:
+        return None, None
+
+    match = TURBO_STREAM_TAG_RE.match(message)
+    if not match:
+        return None, None
+    attributes = dict(ATTRIBUTE_RE.findall(match.group("attributes")))
+    if "action" not in attributes or "target" not in attributes:
+        return None, None
+    return attributes["action"], attributes["target"]
+
+
+class OutboundBuffer:
+    """
+    Bounded buffer of messages waiting to be sent to a slow client.
+
+    1. A `replace` or `update` drops the queued `replace` or `update` on the same target
+    2. Queued messages are sent in one frame when drained
+    3. When the buffer is full, the queued messages are dropped and the client
+    would receive a `refresh` Turbo Stream instead
+    """
+
+    def __init__(self, max_size: int = 100, coalesce: bool = True):
+        self.max_size = max_size
+        self.coalesce = coalesce
+        self.items: List[Tuple[Optional[str], Optional[str], Any]] = []
+        self.sequence: Optional[int] = None
+
+    def __len__(self):
+        return len(self.items)
+
+    def push(self, message, sequence=None):
+        if sequence is not None:
+            self.sequence = sequence
+
+        action, target = parse_turbo_stream_action(message)
+        if self.coalesce and action in SUPERSEDED_ACTIONS:
+            superseded = SUPERSEDED_ACTIONS[action]
+            self.items = [
+                item
+                for item in self.items
+                if not (item[1] == target and item[0] in superseded)
+            ]
+
+        self.items.append((action, target, message))
+
+        if len(self.items) > self.max_size:
+            self.items = [("refresh", None, render_turbo_stream_refresh(None))]
+
+    def drain(self) -> Tuple[List[Any], Optional[int]]:
+        """
+        Return frames to send and the sequence of the last message
+
+        Consecutive HTML messages are merged into one frame
+        """
+        frames: List[Any] = []
+        for _action, _target, message in self.items:
+            if isinstance(message, str) and frames and isinstance(frames[-1], str):
+                frames[-1] = frames[-1] + message
+            else:
+                frames.append(message)
+
+        sequence = self.sequence
+        self.items = []
+        self.sequence = None
+        return frames, sequence
@@ -0,0 +1,162 @@
+"""
+Node-local fan-out, the process joins the channel layer group of a stream once and
+sends the broadcasts to its own subscriptions, so a broadcast is one channel layer
+message for each process instead of each connection
+
+TURBO_HELPER_CABLE_RELAY = True
+"""
+import asyncio
+import logging
+import weakref
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from typing import Dict, Optional, Set, Tuple
+
+from channels.layers import get_channel_layer
+from django.conf import settings
+
+LOGGER = logging.getLogger(__name__)
+
+
+class CableRelay:
+    def __init__(self, channel_layer):
+        self.channel_layer = channel_layer
+        self.channel_name = None
+        # group name -> cable channel instances of this process
+        self.subscribers: Dict[str, Set] = defaultdict(set)
+        # group name -> (lock, number of users), joining and leaving a group
+        # are serialized, so a pending group_discard can not undo a new group_add
+        self.locks: Dict[str, Tuple[asyncio.Lock, int]] = {}
+        # the channel layer drops group members after group_expiry, join again
+        # before that
+        self.refresh_interval = getattr(channel_layer, "group_expiry", 86400) / 2
+        self.starting = None
+        self.receive_task = None
+        self.refresh_task = None
+
+    async def start(self):
+        if self.starting is None:
+            self.starting = asyncio.ensure_future(self._start())
+        await self.starting
+
+    async def _start(self):
+        self.channel_name = await self.channel_layer.new_channel()
+        self.receive_task = asyncio.create_task(self.receive_loop())
+        self.refresh_task = asyncio.create_task(self.refresh_loop())
+
+    def stop(self):
+        for task in (self.receive_task, self.refresh_task):
+            if task:
+                task.cancel()
+
+    @asynccontextmanager
+    async def group_lock(self, group_name):
+        lock, users = self.locks.get(group_name, (None, 0))
+        if lock is None:
+            lock = asyncio.Lock()
+        self.locks[group_name] = (lock, users + 1)
+        try:
+            async with lock:
+                yield
+        finally:
+            lock, users = self.locks[group_name]
+            if users == 1:
+                del self.locks[group_name]
+            else:
+                self.locks[group_name] = (lock, users - 1)
+
+    async def subscribe(self, group_names, cable_channel_instance):
+        await self.start()
+        await asyncio.gather(
+            *[
+                self.join(group_name, cable_channel_instance)
+                for group_name in group_names
+            ]
+        )
+
+    async def unsubscribe(self, group_names, cable_channel_instance):
+        await asyncio.gather(
+            *[
+                self.leave(group_name, cable_channel_instance)
+                for group_name in group_names
+            ]
+        )
+
+    async def join(self, group_name, cable_channel_instance):
+        async with self.group_lock(group_name):
+            if group_name not in self.subscribers:
+                # first subscription of this process
+                await self.channel_layer.group_add(group_name, self.channel_name)
+            self.subscribers[group_name].add(cable_channel_instance)
+
+    async def leave(self, group_name, cable_channel_instance):
+        async with self.group_lock(group_name):
+            subscribers = self.subscribers.get(group_name)
+            if subscribers is None:
+                return
+            subscribers.discard(cable_channel_instance)
+            if not subscribers:
+                # no other subscription of this process
+                del self.subscribers[group_name]
+                await self.channel_layer.group_discard(group_name, self.channel_name)
+
+    async def refresh_loop(self):
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            for group_name in list(self.subscribers):
+                try:
+                    async with self.group_lock(group_name):
+                        if group_name in self.subscribers:
+                            await self.channel_layer.group_add(
+                                group_name, self.channel_name
+                            )
+                except Exception:
+                    LOGGER.exception("Relay failed to join the group %s", group_name)
+
+    async def receive_loop(self):
+        while True:
+            try:
+                event = await self.channel_layer.receive(self.channel_name)
+            except Exception:
+                LOGGER.exception("Relay failed to receive from the channel layer")
+                await asyncio.sleep(1)
+                continue
+
+            if event.get("type") != "action_cable_message":
+                continue
+            subscribers = self.subscribers.get(event["group"])
+            if not subscribers:
+                continue
+
+            # wait for all subscribers before the next event, to keep the order
+            results = await asyncio.gather(
+                *[
+                    cable_channel_instance.receive_broadcast(event)
+                    for cable_channel_instance in list(subscribers)
+                ],
+                return_exceptions=True,
+            )
+            for result in results:
+                if isinstance(result, Exception):
+                    LOGGER.error("Relay failed to send a broadcast", exc_info=result)
+
+
+# one relay for each event loop, the channel layer connections belong to the loop
+_relays: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, CableRelay]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_cable_relay() -> Optional[CableRelay]:
+    if not getattr(settings, "TURBO_HELPER_CABLE_RELAY", False):
+        return None
+
+    loop = asyncio.get_running_loop()
+    channel_layer = get_channel_layer()
+    relay = _relays.get(loop)
+    if relay is None or relay.channel_layer is not channel_layer:
+        if relay is not None:
+            # CHANNEL_LAYERS has changed
+            relay.stop()
+        relay = _relays[loop] = CableRelay(channel_layer)
+    return relay
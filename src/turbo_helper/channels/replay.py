@@ -0,0 +1,106 @@
+import threading
+from collections import deque
+from fnmatch import fnmatchcase
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.utils.module_loading import import_string
+
+
+class ReplayBuffer:
+    """
+    Keep the most recent messages broadcast to a stream, each with a sequence number,
+    so a client resubscribing after a transient disconnect can ask for the messages
+    it missed instead of reloading the whole page.
+
+    Subclass it to store the messages somewhere shared by all the processes (Redis, etc.)
+    """
+
+    def __init__(self, streams: Optional[List[str]] = None, max_size: int = 100):
+        # stream name patterns, for example ["chat_*"]
+        self.streams = streams if streams is not None else ["*"]
+        self.max_size = max_size
+
+    def handles(self, stream_name: str) -> bool:
+        return any(fnmatchcase(stream_name, pattern) for pattern in self.streams)
+
+    def append(self, stream_name: str, message: Any) -> int:
+        """
+        Store the message and return its sequence number
+        """
+        raise NotImplementedError("Please implement append method")
+
+    def since(self, stream_name: str, sequence: int) -> Optional[List[Tuple[int, Any]]]:
+        """
+        Return messages which sequence is greater than `sequence`
+
+        Return None if some of them have already been dropped from the buffer,
+        then the client can not be resumed.
+        """
+        raise NotImplementedError("Please implement since method")
+
+
+class InMemoryReplayBuffer(ReplayBuffer):
+    """
+    Only work when broadcasts are sent from the same process which serves the websocket
+    connections, for example, Daphne serving both HTTP and websocket.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._lock = threading.Lock()
+        self._sequences: Dict[str, int] = {}
+        self._messages: Dict[str, deque] = {}
+
+    def append(self, stream_name, message):
+        with self._lock:
+            sequence = self._sequences.get(stream_name, 0) + 1
+            self._sequences[stream_name] = sequence
+            if stream_name not in self._messages:
+                self._messages[stream_name] = deque(maxlen=self.max_size)
+            self._messages[stream_name].append((sequence, message))
+        return sequence
+
+    def since(self, stream_name, sequence):
+        with self._lock:
+            messages = list(self._messages.get(stream_name, ()))
+            current = self._sequences.get(stream_name, 0)
+
+        if sequence >= current:
+            return []
+
+        if not messages or messages[0][0] > sequence + 1:
+            return None
+
+        return [item for item in messages if item[0] > sequence]
+
+
+@lru_cache(maxsize=None)
+def get_replay_buffer() -> Optional[ReplayBuffer]:
+    """
+    TURBO_HELPER_REPLAY_BUFFER = {
+        "BACKEND": "turbo_helper.channels.replay.InMemoryReplayBuffer",
+        "OPTIONS": {
+            "streams": ["chat_*"],
+            "max_size": 100,
+        },
+    }
+    """
+    config = getattr(settings, "TURBO_HELPER_REPLAY_BUFFER", None)
+    if not config:
+        return None
+
+    backend_class = import_string(
+        config.get("BACKEND", "turbo_helper.channels.replay.InMemoryReplayBuffer")
+    )
+    return backend_class(**config.get("OPTIONS", {}))
+
+
+def _reset_replay_buffer(setting, **kwargs):
+    if setting == "TURBO_HELPER_REPLAY_BUFFER":
+        get_replay_buffer.cache_clear()
+
+
+setting_changed.connect(_reset_replay_buffer)
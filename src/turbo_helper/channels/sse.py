@@ -0,0 +1,175 @@
+"""
+Server-Sent Events transport, for pages which only receive turbo streams
+
+urlpatterns = [
+    path("turbo-streams/", turbo_stream_sse_view, name="turbo_stream_sse"),
+]
+
+{% turbo_stream_from "chat" chat.pk transport="sse" %}
+"""
+import asyncio
+from typing import Dict, List
+from urllib.parse import parse_qsl, urlencode
+
+from asgiref.sync import sync_to_async
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.http import HttpResponseForbidden, StreamingHttpResponse
+
+from turbo_helper.renderers import render_turbo_stream_refresh
+
+from .replay import get_replay_buffer
+from .stream_name import (
+    is_stream_prefix,
+    shard_group_name_from,
+    verify_stream_names_from,
+)
+
+SSE_CONTENT_TYPE = "text/event-stream"
+
+
+def format_event(message, event_id=None) -> str:
+    lines = [f"id: {event_id}"] if event_id is not None else []
+    lines.extend(f"data: {line}" for line in str(message).split("\n"))
+    return "\n".join(lines) + "\n\n"
+
+
+def format_event_id(last_sequences: Dict[str, int], stream_names: List[str]) -> str:
+    """
+    Each stream has its own sequence numbers, EventSource only keeps the id of the
+    last event, so the id has the last sequence of every stream
+
+    "12" for one stream, "chat_1=12&notifications=3" for many streams
+    """
+    if len(stream_names) == 1:
+        return str(last_sequences[stream_names[0]])
+    return urlencode(sorted(last_sequences.items()))
+
+
+def parse_event_id(last_event_id, stream_names: List[str]) -> Dict[str, int]:
+    if not last_event_id:
+        return {}
+
+    if len(stream_names) == 1:
+        pairs = [(stream_names[0], last_event_id)]
+    else:
+        pairs = parse_qsl(last_event_id)
+
+    last_sequences = {}
+    for stream_name, sequence in pairs:
+        if stream_name not in stream_names:
+            continue
+        try:
+            last_sequences[stream_name] = int(sequence)
+        except ValueError:
+            continue
+    return last_sequences
+
+
+async def replay_events(last_sequences: Dict[str, int]):
+    """
+    EventSource sends the id of the last received event as `Last-Event-ID`
+    when it reconnects, resume each stream which has a replay buffer from it
+
+    Return a list of (stream_name, sequence, message)
+    """
+    replay_buffer = get_replay_buffer()
+    if not replay_buffer:
+        return []
+
+    events = []
+    for stream_name, last_sequence in last_sequences.items():
+        if is_stream_prefix(stream_name) or not replay_buffer.handles(stream_name):
+            continue
+
+        messages = await sync_to_async(replay_buffer.since)(stream_name, last_sequence)
+        if messages is None:
+            # missed messages are gone, let Turbo refresh the page
+            return [(None, None, render_turbo_stream_refresh(request_id=None))]
+        events.extend(
+            (stream_name, sequence, message) for sequence, message in messages
+        )
+    return events
+
+
+async def event_stream(stream_names, last_event_id=None):
+    channel_layer = get_channel_layer()
+    channel_name = await channel_layer.new_channel()
+    # group name -> stream name, sharded streams have their own group names
+    group_streams = {
+        shard_group_name_from(stream_name, channel_name): stream_name
+        for stream_name in stream_names
+    }
+    keepalive = getattr(settings, "TURBO_HELPER_SSE_KEEPALIVE", 15)
+
+    await asyncio.gather(
+        *[
+            channel_layer.group_add(group_name, channel_name)
+            for group_name in group_streams
+        ]
+    )
+    try:
+        # send the headers to the client now
+        yield ": connected\n\n"
+
+        # stream name -> sequence number of the last message sent to the client
+        last_sequences = parse_event_id(last_event_id, stream_names)
+        for stream_name, sequence, message in await replay_events(last_sequences):
+            if sequence is None:
+                yield format_event(message)
+                continue
+            last_sequences[stream_name] = sequence
+            yield format_event(message, format_event_id(last_sequences, stream_names))
+
+        while True:
+            try:
+                event = await asyncio.wait_for(
+                    channel_layer.receive(channel_name), timeout=keepalive
+                )
+            except asyncio.TimeoutError:
+                # proxies close idle connections
+                yield ": keepalive\n\n"
+                continue
+
+            if event.get("type") != "action_cable_message":
+                continue
+            sequence = event.get("sequence")
+            stream_name = group_streams.get(event["group"])
+            if sequence is None or stream_name is None:
+                yield format_event(event["message"])
+                continue
+
+            last_sequence = last_sequences.get(stream_name)
+            if last_sequence is not None and sequence <= last_sequence:
+                # already sent during replay
+                continue
+            last_sequences[stream_name] = sequence
+            yield format_event(
+                event["message"], format_event_id(last_sequences, stream_names)
+            )
+    finally:
+        await asyncio.gather(
+            *[
+                channel_layer.group_discard(group_name, channel_name)
+                for group_name in group_streams
+            ]
+        )
+
+
+async def turbo_stream_sse_view(request):
+    """
+    Subscribe to the signed stream names in the query string, and relay the turbo
+    streams broadcast to them as Server-Sent Events
+    """
+    stream_names = verify_stream_names_from(request.GET)
+    if not stream_names:
+        return HttpResponseForbidden()
+
+    response = StreamingHttpResponse(
+        event_stream(stream_names, request.headers.get("Last-Event-ID")),
+        content_type=SSE_CONTENT_TYPE,
+    )
+    response["Cache-Control"] = "no-cache"
+    # nginx would buffer the response
+    response["X-Accel-Buffering"] = "no"
+    return response
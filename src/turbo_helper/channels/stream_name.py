@@ -1,11 +1,27 @@
-from typing import Tuple
+import sys
+import zlib
+from fnmatch import fnmatchcase
+from typing import List, Sequence, Tuple
 
+from django.conf import settings
 from django.core import signing
 from django.core.signing import Signer
 
 from turbo_helper.templatetags.turbo_helper import dom_id
 
 signer = Signer()
+# a signed stream name can not be used as a signed list of stream names
+names_signer = Signer(salt="turbo_helper.stream_names")
+# a stream prefix is only accepted when signed as a prefix, a stream name ending
+# with "_*" does not give access to the streams under it
+prefix_signer = Signer(salt="turbo_helper.stream_prefixes")
+prefix_names_signer = Signer(salt="turbo_helper.stream_prefix_names")
+
+# "project_42_*" covers "project_42_tasks", "project_42_tasks_1", ...
+PREFIX_WILDCARD = "_*"
+PREFIX_GROUP_SUFFIX = ".prefix"
+# "announcements" -> "announcements.shard0", "announcements.shard1", ...
+SHARD_GROUP_SEPARATOR = ".shard"
 
 
 def stream_name_from(*streamables) -> str:
@@ -18,22 +34,165 @@ def stream_name_from(*streamables) -> str:
         return "_".join(stream_name_from(streamable) for streamable in streamables)
 
 
-def generate_signed_stream_key(stream_name: str) -> str:
+def stream_prefix_from(*streamables) -> str:
+    """
+    Generate stream prefix, which covers all streams starting with the streamables
+    """
+    return stream_name_from(*streamables) + PREFIX_WILDCARD
+
+
+def is_stream_prefix(stream_name: str) -> bool:
+    return stream_name.endswith(PREFIX_WILDCARD)
+
+
+def group_name_from(stream_name: str) -> str:
     """
-    Generate signed stream key from stream_name
+    Channel layer group name of the stream name or stream prefix
     """
-    return signer.sign(stream_name)
+    if is_stream_prefix(stream_name):
+        return stream_name[: -len(PREFIX_WILDCARD)] + PREFIX_GROUP_SUFFIX
+    return stream_name
+
+
+def shard_count_of(stream_name: str) -> int:
+    """
+    Number of channel layer groups the subscribers of the stream are spread over,
+    TURBO_HELPER_SHARDED_STREAMS maps stream name patterns to the number of shards
+
+    TURBO_HELPER_SHARDED_STREAMS = {"announcements": 8}
+    """
+    sharded_streams = getattr(settings, "TURBO_HELPER_SHARDED_STREAMS", None)
+    if not sharded_streams or is_stream_prefix(stream_name):
+        return 1
+
+    for pattern, count in sharded_streams.items():
+        if fnmatchcase(stream_name, pattern):
+            return count
+    return 1
 
 
-def verify_signed_stream_key(signed_stream_key: str) -> Tuple[bool, str]:
+def shard_group_name_from(stream_name: str, channel_name: str) -> str:
+    """
+    Channel layer group which the channel joins for the stream name or stream prefix
+    """
+    count = shard_count_of(stream_name)
+    if count <= 1:
+        return group_name_from(stream_name)
+    # crc32 is the same in every process, unlike hash()
+    shard = zlib.crc32(channel_name.encode()) % count
+    return f"{stream_name}{SHARD_GROUP_SEPARATOR}{shard}"
+
+
+def shard_group_names_from(stream_name: str) -> List[str]:
+    """
+    Channel layer groups which a broadcast to the stream name is sent to
+    """
+    count = shard_count_of(stream_name)
+    if count <= 1:
+        return [stream_name]
+    return [f"{stream_name}{SHARD_GROUP_SEPARATOR}{shard}" for shard in range(count)]
+
+
+def prefix_group_names_from(*streamables) -> List[str]:
+    """
+    Channel layer groups of the stream prefixes covering the streamables,
+    only prefixes matching TURBO_HELPER_PREFIX_STREAMS patterns are returned
+
+    ("project", 42, "tasks") -> ["project.prefix", "project_42.prefix"]
+    """
+    patterns = getattr(settings, "TURBO_HELPER_PREFIX_STREAMS", None)
+    if not patterns:
+        return []
+
+    group_names = []
+    for i in range(1, len(streamables)):
+        stream_prefix = stream_prefix_from(*streamables[:i])
+        if any(fnmatchcase(stream_prefix, pattern) for pattern in patterns):
+            group_names.append(group_name_from(stream_prefix))
+    return group_names
+
+
+def generate_signed_stream_key(stream_name: str, prefix: bool = False) -> str:
+    """
+    Generate signed stream key from stream_name, or stream prefix if `prefix`
+    """
+    return (prefix_signer if prefix else signer).sign(stream_name)
+
+
+def verify_signed_stream_key(
+    signed_stream_key: str, prefix: bool = False
+) -> Tuple[bool, str]:
     """
     Verify signed stream key
     """
     try:
-        unsigned_data = signer.unsign(signed_stream_key)
+        unsigned_data = (prefix_signer if prefix else signer).unsign(signed_stream_key)
         return True, unsigned_data
 
     except signing.BadSignature:
         pass
 
     return False, ""
+
+
+def generate_signed_stream_names_key(
+    stream_names: Sequence[str], prefix: bool = False
+) -> str:
+    """
+    Generate one signed key for a list of stream_name, or stream prefix if `prefix`
+    """
+    return (prefix_names_signer if prefix else names_signer).sign_object(
+        list(stream_names)
+    )
+
+
+def verify_signed_stream_names_key(
+    signed_stream_names_key: str, prefix: bool = False
+) -> Tuple[bool, List[str]]:
+    """
+    Verify signed key of a list of stream_name
+    """
+    try:
+        unsigned_data = (prefix_names_signer if prefix else names_signer).unsign_object(
+            signed_stream_names_key
+        )
+    except (signing.BadSignature, ValueError, TypeError):
+        return False, []
+
+    if isinstance(unsigned_data, list) and all(
+        isinstance(stream_name, str) for stream_name in unsigned_data
+    ):
+        return True, unsigned_data
+    return False, []
+
+
+def verify_stream_names_from(params) -> List[str]:
+    """
+    Stream names of `signed_stream_names` or `signed_stream_name` in the params,
+    or stream prefixes of `signed_stream_prefixes` or `signed_stream_prefix`,
+    empty list if the signature is invalid
+
+    The names are interned, so subscriptions of the same stream share one string.
+    """
+    prefix = bool(
+        params.get("signed_stream_prefixes") or params.get("signed_stream_prefix")
+    )
+    names_key = params.get(
+        "signed_stream_prefixes" if prefix else "signed_stream_names"
+    )
+    if names_key:
+        flag, stream_names = verify_signed_stream_names_key(names_key, prefix=prefix)
+    else:
+        flag, stream_name = verify_signed_stream_key(
+            params.get("signed_stream_prefix" if prefix else "signed_stream_name")
+            or "",
+            prefix=prefix,
+        )
+        stream_names = [stream_name]
+
+    # a stream name which looks like a prefix is not treated as one
+    if not flag or any(
+        is_stream_prefix(stream_name) != prefix for stream_name in stream_names
+    ):
+        return []
+    return [sys.intern(stream_name) for stream_name in stream_names]
@@ -1,23 +1,247 @@
+import asyncio
+import logging
+import re
+
 from actioncable import ActionCableConsumer, CableChannel
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.core.signing import Signer
 
-from .stream_name import verify_signed_stream_key
+from turbo_helper.renderers import render_turbo_stream_refresh
+
+from .outbound import OutboundBuffer
+from .relay import get_cable_relay
+from .replay import get_replay_buffer
+from .stream_name import (
+    is_stream_prefix,
+    shard_group_name_from,
+    verify_stream_names_from,
+)
+
+LOGGER = logging.getLogger(__name__)
 
 signer = Signer()
 
+# the opening tags of the turbo stream elements in the message
+TURBO_STREAM_OPEN_RE = re.compile(r"<turbo-stream(?=[\s>])")
+
+
+def add_sequence(message, sequence):
+    """
+    Add `data-sequence` to the turbo stream elements, Turbo ignores it and the
+    client can read it from the message event, see turbo_helper/js/resume.js
+    """
+    if not isinstance(message, str):
+        return message
+    return TURBO_STREAM_OPEN_RE.sub(
+        f'<turbo-stream data-sequence="{sequence}"', message
+    )
+
+
+def log_flush_failure(task):
+    if not task.cancelled() and task.exception() is not None:
+        LOGGER.error(
+            "Failed to send buffered messages to the client", exc_info=task.exception()
+        )
+
 
 class TurboStreamCableChannel(CableChannel):
+    # a busy node holds one instance for each subscription
+    __slots__ = (
+        "params",
+        "identifier_key",
+        "consumer",
+        "stream_names",
+        "group_names",
+        "relay",
+        "last_sequences",
+        "pending_events",
+        "flush_interval",
+        "outbound_buffer",
+        "flush_task",
+    )
+
     def __init__(self, consumer: ActionCableConsumer, identifier_key, params=None):
         self.params = params if params else {}
         self.identifier_key = identifier_key
         self.consumer = consumer
-        self.group_name = None
+        self.stream_names = ()
+        self.group_names = ()
+        self.relay = None
+        # group name -> sequence number of the last message sent to the client,
+        # created when the first message with sequence is sent
+        self.last_sequences = None
+        # broadcasts received before the replay is done, sent after the replayed
+        # messages
+        self.pending_events = None
+
+        # TURBO_HELPER_CABLE_OUTBOUND_BUFFER = {"max_size": 100, "flush_interval": 0.05}
+        outbound_config = getattr(settings, "TURBO_HELPER_CABLE_OUTBOUND_BUFFER", None)
+        if outbound_config:
+            outbound_config = dict(outbound_config)
+            self.flush_interval = outbound_config.pop("flush_interval", 0)
+            self.outbound_buffer = OutboundBuffer(**outbound_config)
+        else:
+            self.flush_interval = 0
+            self.outbound_buffer = None
+        self.flush_task = None
+
+    def verify_stream_names(self):
+        """
+        <turbo-cable-stream-source signed-stream-name="..."> subscribes to one stream
+        <turbo-cable-stream-source data-signed-stream-names="..."> subscribes to many
+        <turbo-cable-stream-source data-signed-stream-prefix="..."> subscribes to a prefix
+        """
+        return verify_stream_names_from(self.params)
 
     async def subscribe(self):
-        flag, stream_name = verify_signed_stream_key(self.params["signed_stream_name"])
-        self.group_name = stream_name
-        if flag:
-            await self.consumer.subscribe_group(self.group_name, self)
+        self.stream_names = tuple(self.verify_stream_names())
+
+        if hasattr(self.consumer, "subscribe_groups"):
+            # TurboStreamCableConsumer replays the missed messages after the
+            # subscription is confirmed, hold the broadcasts until then, the relay
+            # can send one as soon as it has joined the group
+            self.pending_events = []
+
+        # TurboStreamCableConsumer unsubscribes from the relay when disconnected
+        relay = (
+            get_cable_relay() if hasattr(self.consumer, "subscribe_groups") else None
+        )
+        if relay:
+            await relay.start()
+            channel_name = relay.channel_name
+        else:
+            channel_name = self.consumer.channel_name
+
+        group_names = tuple(
+            shard_group_name_from(stream_name, channel_name)
+            for stream_name in self.stream_names
+        )
+        # share the tuple if there is no stream prefix or sharded stream
+        self.group_names = (
+            self.stream_names if group_names == self.stream_names else group_names
+        )
+
+        if relay:
+            self.relay = relay
+            await relay.subscribe(self.group_names, self)
+        elif len(self.group_names) == 1:
+            await self.consumer.subscribe_group(self.group_names[0], self)
+        elif hasattr(self.consumer, "subscribe_groups"):
+            await self.consumer.subscribe_groups(self.group_names, self)
+        else:
+            for group_name in self.group_names:
+                await self.consumer.subscribe_group(group_name, self)
 
     async def unsubscribe(self):
-        await self.consumer.unsubscribe_group(self.group_name, self)
+        if self.flush_task:
+            self.flush_task.cancel()
+            self.flush_task = None
+
+        if self.relay:
+            await self.relay.unsubscribe(self.group_names, self)
+            self.relay = None
+            self.consumer.identifier_to_channel_instance_map.pop(
+                self.identifier_key, None
+            )
+        elif hasattr(self.consumer, "unsubscribe_groups"):
+            await self.consumer.unsubscribe_groups(self.group_names, self)
+        else:
+            for group_name in self.group_names:
+                await self.consumer.unsubscribe_group(group_name, self)
+
+    async def replay(self):
+        """
+        Resume the client from the `last_sequence` param, called by
+        TurboStreamCableConsumer after `confirm_subscription` is sent
+
+        <turbo-cable-stream-source data-last-sequence="12"> would be sent as `last_sequence`
+
+        Only work when subscribing to one stream
+        """
+        try:
+            await self._replay()
+        finally:
+            pending_events, self.pending_events = self.pending_events, None
+            for event in pending_events or ():
+                await self.receive_broadcast(event)
+
+    async def _replay(self):
+        try:
+            last_sequence = int(self.params["last_sequence"])
+        except (KeyError, TypeError, ValueError):
+            return
+
+        if len(self.stream_names) != 1 or is_stream_prefix(self.stream_names[0]):
+            return
+        stream_name = self.stream_names[0]
+        # broadcasts of sharded streams come from the shard group
+        group_name = self.group_names[0]
+
+        replay_buffer = get_replay_buffer()
+        if not replay_buffer or not replay_buffer.handles(stream_name):
+            return
+
+        messages = await sync_to_async(replay_buffer.since)(stream_name, last_sequence)
+        if messages is None:
+            # missed messages are gone, let Turbo refresh the page
+            await self.send_message(render_turbo_stream_refresh(request_id=None))
+            return
+
+        for sequence, message in messages:
+            await self.send_message(message, sequence=sequence, group_name=group_name)
+
+    async def receive_broadcast(self, event):
+        """
+        Called by TurboStreamCableConsumer when the group receives a message
+        """
+        if self.pending_events is not None:
+            self.pending_events.append(event)
+            return
+        await self.send_message(
+            event["message"], sequence=event.get("sequence"), group_name=event["group"]
+        )
+
+    async def send_message(self, message, sequence=None, group_name=None):
+        if sequence is not None:
+            if self.last_sequences is None:
+                self.last_sequences = {}
+            last_sequence = self.last_sequences.get(group_name)
+            if last_sequence is not None and sequence <= last_sequence:
+                # already sent during replay
+                return
+            self.last_sequences[group_name] = sequence
+
+        if self.outbound_buffer is None:
+            await self.send_frame(message, sequence)
+            return
+
+        self.outbound_buffer.push(message, sequence)
+        if self.flush_task is None:
+            self.flush_task = asyncio.create_task(self.flush())
+            self.flush_task.add_done_callback(log_flush_failure)
+
+    async def flush(self):
+        """
+        Send buffered messages, new messages which arrive while the client is
+        receiving would be coalesced and sent in the next round.
+        """
+        try:
+            while len(self.outbound_buffer):
+                if self.flush_interval:
+                    await asyncio.sleep(self.flush_interval)
+                frames, sequence = self.outbound_buffer.drain()
+                for frame in frames:
+                    await self.send_frame(frame, sequence)
+        finally:
+            self.flush_task = None
+
+    async def send_frame(self, message, sequence=None):
+        if sequence is not None:
+            message = add_sequence(message, sequence)
+        await self.consumer.send_json(
+            {
+                "identifier": self.identifier_key,
+                "message": message,
+            }
+        )
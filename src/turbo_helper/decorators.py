@@ -0,0 +1,50 @@
+import hashlib
+from functools import wraps
+from typing import Any, Callable, Optional
+
+from django.utils.cache import patch_vary_headers
+from django.views.decorators.http import condition
+
+
+def turbo_frame_condition(
+    version_func: Optional[Callable[..., Any]] = None,
+    last_modified_func: Optional[Callable[..., Any]] = None,
+):
+    """
+    Conditional GET for turbo frame responses
+
+    ETag is computed from the `Turbo-Frame` header and the value returned by
+    `version_func(request, *args, **kwargs)`, if the client already has it,
+    304 is returned without calling the view.
+
+    @turbo_frame_condition(lambda request, pk: Task.objects.get(pk=pk).updated_at)
+    def task_detail(request, pk):
+        pass
+    """
+
+    def etag_func(request, *args, **kwargs):
+        if version_func is None:
+            return None
+        version = version_func(request, *args, **kwargs)
+        if version is None:
+            return None
+        frame = request.headers.get("Turbo-Frame", "")
+        return hashlib.md5(
+            f"{frame}:{version}".encode(), usedforsecurity=False
+        ).hexdigest()
+
+    def decorator(view_func):
+        conditional_view = condition(
+            etag_func=etag_func, last_modified_func=last_modified_func
+        )(view_func)
+
+        @wraps(view_func)
+        def inner(request, *args, **kwargs):
+            response = conditional_view(request, *args, **kwargs)
+            # different frames of the same URL have different content
+            patch_vary_headers(response, ("Turbo-Frame",))
+            return response
+
+        return inner
+
+    return decorator
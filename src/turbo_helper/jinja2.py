@@ -0,0 +1,111 @@
+"""
+Jinja2 support
+
+TEMPLATES = [
+    {
+        "BACKEND": "django.template.backends.jinja2.Jinja2",
+        "OPTIONS": {
+            "extensions": ["turbo_helper.jinja2.TurboHelperExtension"],
+        },
+    },
+]
+
+{% turbo_frame "message_1", src="/messages/1/" %}Loading...{% endturbo_frame %}
+
+{% turbo_stream "append", "messages" %}<div>Hello</div>{% endturbo_stream %}
+
+{% turbo_stream_all "remove", ".old_records" %}{% endturbo_stream_all %}
+
+{% turbo_stream_from "chat", chat.pk %}
+
+{% turbo_streams_from "announcements", ["chat", chat.pk] %}
+"""
+from jinja2 import nodes
+from jinja2.ext import Extension
+from template_simplify.templatetags.template_simplify import dom_id
+
+from turbo_helper.renderers import (
+    render_turbo_frame,
+    render_turbo_stream_from,
+    render_turbo_streams_from,
+)
+from turbo_helper.stream import action_proxy, turbo_stream
+
+
+class TurboHelperExtension(Extension):
+    tags = {
+        "turbo_frame",
+        "turbo_stream",
+        "turbo_stream_all",
+        "turbo_stream_from",
+        "turbo_streams_from",
+    }
+
+    def __init__(self, environment):
+        super().__init__(environment)
+        environment.globals.update(
+            {
+                "dom_id": dom_id,
+                "turbo_stream": turbo_stream,
+            }
+        )
+
+    def parse(self, parser):
+        token = next(parser.stream)
+        tag = token.value
+        args, kwargs = self.parse_arguments(parser)
+        call = self.call_method(f"_{tag}", args, kwargs)
+
+        if tag in ("turbo_stream_from", "turbo_streams_from"):
+            return nodes.Output([call]).set_lineno(token.lineno)
+
+        body = parser.parse_statements((f"name:end{tag}",), drop_needle=True)
+        return nodes.CallBlock(call, [], [], body).set_lineno(token.lineno)
+
+    def parse_arguments(self, parser):
+        """
+        Positional and keyword arguments, commas are optional
+        """
+        args = []
+        kwargs = []
+        while parser.stream.current.type != "block_end":
+            if (
+                parser.stream.current.type == "name"
+                and parser.stream.look().type == "assign"
+            ):
+                key = next(parser.stream).value
+                parser.stream.skip()
+                kwargs.append(nodes.Keyword(key, parser.parse_expression()))
+            else:
+                args.append(parser.parse_expression())
+            parser.stream.skip_if("comma")
+        return args, kwargs
+
+    def _turbo_frame(self, frame_id, caller, **attributes):
+        return render_turbo_frame(
+            frame_id=frame_id,
+            attributes={key: str(value) for key, value in attributes.items()},
+            content=caller(),
+        )
+
+    def _turbo_stream(self, action, target, caller, **attributes):
+        return action_proxy(
+            action=action,
+            target=target,
+            content=caller(),
+            **{key: str(value) for key, value in attributes.items()},
+        )
+
+    def _turbo_stream_all(self, action, targets, caller, **attributes):
+        return action_proxy(
+            action=action,
+            targets=targets,
+            content=caller(),
+            **{key: str(value) for key, value in attributes.items()},
+        )
+
+    def _turbo_stream_from(self, *stream_name_array, **options):
+        return render_turbo_stream_from(list(stream_name_array), **options)
+
+    def _turbo_streams_from(self, *streams, **options):
+        return render_turbo_streams_from(list(streams), **options)
@@ -0,0 +1,57 @@
+import asyncio
+
+from django.core.management.base import BaseCommand
+
+from turbo_helper.channels.loadtest import run_load_test
+
+
+class Command(BaseCommand):
+    help = (
+        "Simulate Action Cable subscribers on InMemoryChannelLayer, broadcast to them "
+        "and report delivery latency, throughput and memory"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--subscribers", type=int, default=1000)
+        parser.add_argument(
+            "--streams",
+            type=int,
+            default=1,
+            help="Number of streams the subscribers are spread over",
+        )
+        parser.add_argument("--broadcasts", type=int, default=10)
+        parser.add_argument(
+            "--rate",
+            type=float,
+            default=10.0,
+            help="Broadcasts per second, 0 to broadcast as fast as possible",
+        )
+        parser.add_argument(
+            "--relay",
+            action="store_true",
+            default=None,
+            help="Enable TURBO_HELPER_CABLE_RELAY",
+        )
+        parser.add_argument(
+            "--timeout",
+            type=float,
+            default=30.0,
+            help="Seconds to wait for the messages after the last broadcast",
+        )
+
+    def handle(self, *args, **options):
+        result = asyncio.run(
+            run_load_test(
+                subscribers=options["subscribers"],
+                streams=options["streams"],
+                broadcasts=options["broadcasts"],
+                rate=options["rate"],
+                timeout=options["timeout"],
+                relay=options["relay"],
+            )
+        )
+        self.stdout.write(result.report())
+        if result.delivered < result.expected:
+            self.stderr.write(
+                f"{result.expected - result.delivered} messages were not delivered"
+            )
@@ -1,8 +1,44 @@
+"""
+Elements are built with string formatting instead of a template engine, so they can
+be rendered from any template backend (Django, Jinja2), values are escaped the same
+way as Django template variables.
+"""
+import html
+import re
+from functools import lru_cache
 from typing import Any, Dict, List, Optional
+from urllib.parse import urlencode
 
-from django.template import engines
-from django.utils.html import escape
-from django.utils.safestring import mark_safe
+from django.urls import reverse
+from django.utils.html import conditional_escape, escape
+from django.utils.safestring import SafeString
+
+
+@lru_cache(maxsize=1024)
+def attribute_name(key: str) -> str:
+    # convert data_xxx to data-xxx
+    if key.startswith("data"):
+        return key.replace("_", "-")
+    return key
+
+
+def render_attributes(attributes: Dict[str, Any]) -> str:
+    """
+    Render attributes in one pass, values which are None are skipped
+
+    Same as `escape`, without creating SafeString for every value, and numbers
+    do not need to be escaped.
+    """
+    # TODO: bool type django/forms/widgets/attrs.html
+    return " ".join(
+        [
+            f'{attribute_name(key)}="{value}"'
+            if type(value) is int
+            else f'{attribute_name(key)}="{html.escape(str(value))}"'
+            for key, value in attributes.items()
+            if value is not None
+        ]
+    )
 
 
 def render_turbo_stream(
@@ -12,80 +48,221 @@ def render_turbo_stream(
     target: Optional[str] = None,
     targets: Optional[str] = None,
 ) -> str:
-    element_attributes = {}
-    for key, value in attributes.items():
-        # convert data_xxx to data-xxx
-        if key.startswith("data"):
-            element_attributes[key.replace("_", "-")] = value
-        else:
-            element_attributes[key] = value
-
-    element_attributes_array = []
-    for key, value in element_attributes.items():
-        if value is None:
-            continue
-        # TODO: bool type django/forms/widgets/attrs.html
-        element_attributes_array.append(f'{key}="{escape(value)}"')
-
-    attribute_string = mark_safe(" ".join(element_attributes_array))
-
-    django_engine = engines["django"]
-    template_string = """<turbo-stream action="{{ action }}"{% if target %} target="{{ target }}"{% elif targets %} targets="{{ targets }}"{% endif %}{% if attribute_string %} {{ attribute_string }}{% endif %}><template>{{ content|default:'' }}</template></turbo-stream>"""
-    context = {
-        "content": content,
-        "action": action,
-        "target": target,
-        "targets": targets,
-        "attribute_string": attribute_string,
-    }
-    return django_engine.from_string(template_string).render(context)
+    attribute_string = render_attributes(attributes)
+
+    if target:
+        target_string = f' target="{conditional_escape(target)}"'
+    elif targets:
+        target_string = f' targets="{conditional_escape(targets)}"'
+    else:
+        target_string = ""
+
+    return SafeString(
+        f'<turbo-stream action="{conditional_escape(action)}"{target_string}'
+        f'{" " + attribute_string if attribute_string else ""}>'
+        f'<template>{conditional_escape(content) if content else ""}</template>'
+        "</turbo-stream>"
+    )
+
+
+# values passed to the action handler when it is compiled, they are not changed
+# by escaping or by the key and value transforms of turbo_power
+SLOT_PLACEHOLDER = "turbohelperslot{}end"
+CONTENT_PLACEHOLDER = "turbohelpercontentend"
+re_slot = re.compile(r'( [^\s="]+=")turbohelperslot(\d+)end"')
+
+
+class CompiledTurboStream:
+    """
+    Turbo Stream element of an action with fixed attribute keys, split from the output
+    of the action handler called with placeholders, so a call only escapes and fills
+    in the values, and the attribute names and default attributes are the same as
+    the handler renders.
+
+    Slot 0 is the target, slot N is the Nth key. Values are positional in the order of
+    `keys`, None values drop their attribute, values which are not strings or
+    integers are passed to `render`, which calls the handler.
+    """
+
+    __slots__ = ("action", "keys", "size", "parts", "content", "render")
+
+    def __init__(self, action: str, keys: List[str], output: str, render=None):
+        self.action = action
+        self.keys = tuple(keys)
+        self.size = len(self.keys)
+        self.render = render
+
+        # static strings, (slot, ' name="') of the values, None for the content
+        parts: List[Any] = []
+        slots = set()
+        position = 0
+        for match in re_slot.finditer(output):
+            parts.append(output[position : match.start()])
+            slot = int(match.group(2))
+            if slot in slots:
+                raise ValueError(f"Slot {slot} of '{action}' is rendered twice")
+            slots.add(slot)
+            parts.append((slot, match.group(1)))
+            position = match.end()
+        parts.append(output[position:])
+
+        self.parts = []
+        self.content = False
+        for part in parts:
+            if not isinstance(part, str):
+                self.parts.append(part)
+                continue
+            if "turbohelperslot" in part:
+                raise ValueError(self.not_attribute_message(part))
+            if CONTENT_PLACEHOLDER in part:
+                before, _, after = part.partition(CONTENT_PLACEHOLDER)
+                self.parts += [before, None, after]
+                self.content = True
+            else:
+                self.parts.append(part)
+        self.parts = [part for part in self.parts if part != ""]
+
+        missing = set(range(1, self.size + 1)) - slots
+        if missing:
+            raise ValueError(
+                f"'{self.keys[min(missing) - 1]}' of '{action}' is not rendered as "
+                "an attribute, it can not be compiled"
+            )
+
+    def not_attribute_message(self, part):
+        slot = int(re.search(r"turbohelperslot(\d+)end", part).group(1))
+        key = self.keys[slot - 1] if slot else "target"
+        return (
+            f"'{key}' of '{self.action}' is not rendered as an attribute, "
+            "it can not be compiled"
+        )
+
+    def __call__(self, target, *values, content=None) -> str:
+        if len(values) != self.size:
+            raise TypeError(
+                f"'{self.action}' takes {self.size} values {self.keys}, "
+                f"{len(values)} given"
+            )
+        if content and not self.content:
+            raise TypeError(f"'{self.action}' does not render content")
+
+        values = (target, *values)
+        output = []
+        for part in self.parts:
+            if type(part) is str:
+                output.append(part)
+            elif part is None:
+                if content:
+                    output.append(conditional_escape(content))
+            else:
+                slot, name = part
+                value = values[slot]
+                if value is None or (slot == 0 and not value):
+                    continue
+                if slot == 0:
+                    value = conditional_escape(value)
+                elif type(value) is int:
+                    value = str(value)
+                elif isinstance(value, str):
+                    value = html.escape(value)
+                elif self.render is not None:
+                    # bool, dict, etc. are transformed by the handler
+                    return self.render(*values, content=content)
+                else:
+                    value = html.escape(str(value))
+                output += (name, value, '"')
+        return SafeString("".join(output))
 
 
 def render_turbo_frame(frame_id: str, content: str, attributes: Dict[str, Any]) -> str:
-    # convert data_xxx to data-xxx
-    element_attributes = {}
-    for key, value in attributes.items():
-        # convert data_xxx to data-xxx
-        if key.startswith("data"):
-            element_attributes[key.replace("_", "-")] = value
-        else:
-            element_attributes[key] = value
-
-    element_attributes_array = []
-    for key, value in element_attributes.items():
-        if value is None:
-            continue
-        # TODO: bool type django/forms/widgets/attrs.html
-        element_attributes_array.append(f'{key}="{escape(value)}"')
-
-    attribute_string = mark_safe(" ".join(element_attributes_array))
-
-    django_engine = engines["django"]
-    template_string = """<turbo-frame id="{{ frame_id }}"{% if attribute_string %} {{ attribute_string }}{% endif %}>{{ content }}</turbo-frame>"""  # noqa
-    context = {
-        "frame_id": frame_id,
-        "content": content,
-        "attribute_string": attribute_string,
-    }
-    return django_engine.from_string(template_string).render(context)
-
-
-def render_turbo_stream_from(stream_name_array: List[Any]):
+    attribute_string = render_attributes(attributes)
+
+    return SafeString(
+        f'<turbo-frame id="{conditional_escape(frame_id)}"'
+        f'{" " + attribute_string if attribute_string else ""}>'
+        f"{conditional_escape(content)}</turbo-frame>"
+    )
+
+
+def render_sse_stream_source(**params) -> str:
+    """
+    Turbo connects <turbo-stream-source> to `src` with EventSource
+    """
+    src = f"{reverse('turbo_stream_sse')}?{urlencode(params)}"
+    return SafeString(
+        f'<turbo-stream-source src="{escape(src)}"></turbo-stream-source>'
+    )
+
+
+def render_turbo_stream_from(
+    stream_name_array: List[Any], prefix: bool = False, transport: str = "cable"
+):
     from turbo_helper.channels.stream_name import (
         generate_signed_stream_key,
         stream_name_from,
+        stream_prefix_from,
     )
     from turbo_helper.channels.streams_channel import TurboStreamCableChannel
 
-    stream_name_string = stream_name_from(*stream_name_array)
+    if prefix:
+        stream_name_string = stream_prefix_from(*stream_name_array)
+    else:
+        stream_name_string = stream_name_from(*stream_name_array)
 
-    django_engine = engines["django"]
-    template_string = """<turbo-cable-stream-source channel="{{ channel }}" signed-stream-name="{{ signed_stream_name }}"></turbo-cable-stream-source>"""  # noqa
-    context = {
-        "signed_stream_name": generate_signed_stream_key(stream_name_string),
-        "channel": TurboStreamCableChannel.__name__,
-    }
-    return django_engine.from_string(template_string).render(context)
+    signed_stream_name = generate_signed_stream_key(stream_name_string, prefix=prefix)
+    if prefix:
+        # the prefix is signed with its own salt and sent as its own param
+        if transport == "sse":
+            return render_sse_stream_source(signed_stream_prefix=signed_stream_name)
+        return SafeString(
+            f'<turbo-cable-stream-source channel="{TurboStreamCableChannel.__name__}" '
+            f'data-signed-stream-prefix="{escape(signed_stream_name)}"></turbo-cable-stream-source>'
+        )
+
+    if transport == "sse":
+        return render_sse_stream_source(signed_stream_name=signed_stream_name)
+    return SafeString(
+        f'<turbo-cable-stream-source channel="{TurboStreamCableChannel.__name__}" '
+        f'signed-stream-name="{escape(signed_stream_name)}"></turbo-cable-stream-source>'
+    )
+
+
+def render_turbo_streams_from(
+    streams: List[Any], prefix: bool = False, transport: str = "cable"
+):
+    """
+    Subscribe to many streams with one element, each item of `streams` is a streamable
+    or a list of streamables
+    """
+    from turbo_helper.channels.stream_name import (
+        generate_signed_stream_names_key,
+        stream_name_from,
+        stream_prefix_from,
+    )
+    from turbo_helper.channels.streams_channel import TurboStreamCableChannel
+
+    name_from = stream_prefix_from if prefix else stream_name_from
+    stream_names = [
+        name_from(*stream) if isinstance(stream, (list, tuple)) else name_from(stream)
+        for stream in streams
+    ]
+
+    signed_stream_names = generate_signed_stream_names_key(stream_names, prefix=prefix)
+    if prefix:
+        # the prefixes are signed with their own salt and sent as their own param
+        if transport == "sse":
+            return render_sse_stream_source(signed_stream_prefixes=signed_stream_names)
+        return SafeString(
+            f'<turbo-cable-stream-source channel="{TurboStreamCableChannel.__name__}" '
+            f'data-signed-stream-prefixes="{escape(signed_stream_names)}"></turbo-cable-stream-source>'
+        )
+
+    if transport == "sse":
+        return render_sse_stream_source(signed_stream_names=signed_stream_names)
+    return SafeString(
+        f'<turbo-cable-stream-source channel="{TurboStreamCableChannel.__name__}" '
+        f'data-signed-stream-names="{escape(signed_stream_names)}"></turbo-cable-stream-source>'
+    )
 
 
 def render_turbo_stream_refresh(request_id, **attributes):
@@ -1,14 +1,132 @@
+import hashlib
 import http
+import re
+import threading
+from collections import OrderedDict
+from functools import lru_cache
 
-from django.http import HttpResponse, HttpResponseRedirect
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.http import HttpResponse, HttpResponseRedirect, StreamingHttpResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_string
 
 from .constants import TURBO_STREAM_MIME_TYPE
 
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+re_accepts_br = re.compile(r"\bbr\b")
+re_accepts_gzip = re.compile(r"\bgzip\b")
+
+# same as GZipMiddleware, it is not worth compressing small payloads
+MIN_COMPRESS_LENGTH = 200
+
 
 class HttpResponseSeeOther(HttpResponseRedirect):
     status_code = http.HTTPStatus.SEE_OTHER
 
 
+class CompressedContentCache:
+    """
+    Compressed payloads keyed by (encoding, content hash), the least recently used
+    ones are dropped when the cache is full.
+    """
+
+    def __init__(self, max_size=128):
+        self.max_size = max_size
+        self.lock = threading.Lock()
+        self.cache: OrderedDict = OrderedDict()
+
+    def get(self, encoding, content: bytes) -> bytes:
+        key = (encoding, hashlib.sha256(content).digest())
+        with self.lock:
+            compressed = self.cache.get(key)
+            if compressed is not None:
+                self.cache.move_to_end(key)
+                return compressed
+
+        if encoding == "br":
+            compressed = brotli.compress(content)
+        else:
+            compressed = compress_string(content)
+
+        with self.lock:
+            self.cache[key] = compressed
+            if len(self.cache) > self.max_size:
+                self.cache.popitem(last=False)
+        return compressed
+
+    def clear(self):
+        with self.lock:
+            self.cache.clear()
+
+
+@lru_cache(maxsize=None)
+def get_compressed_content_cache() -> CompressedContentCache:
+    return CompressedContentCache(
+        getattr(settings, "TURBO_HELPER_COMPRESSED_RESPONSE_CACHE_SIZE", 128)
+    )
+
+
+def _reset_compressed_content_cache(setting, **kwargs):
+    if setting == "TURBO_HELPER_COMPRESSED_RESPONSE_CACHE_SIZE":
+        get_compressed_content_cache.cache_clear()
+
+
+setting_changed.connect(_reset_compressed_content_cache)
+
+
+def accepted_encoding(request):
+    accept_encoding = request.META.get("HTTP_ACCEPT_ENCODING", "")
+    if brotli is not None and re_accepts_br.search(accept_encoding):
+        return "br"
+    if re_accepts_gzip.search(accept_encoding):
+        return "gzip"
+    return None
+
+
 class TurboStreamResponse(HttpResponse):
+    """
+    If `precompress` is True, the content is compressed once and cached by its hash,
+    so repeated payloads are served compressed without compressing them again,
+    GZipMiddleware skips the response since it has `Content-Encoding`.
+
+    return TurboStreamResponse(content, request=request, precompress=True)
+    """
+
+    def __init__(self, content=b"", *args, request=None, precompress=False, **kwargs):
+        if isinstance(content, (list, tuple)) and all(
+            isinstance(element, str) for element in content
+        ):
+            # join once, HttpResponse would encode the elements one by one
+            content = "".join(content)
+        super().__init__(content, *args, content_type=TURBO_STREAM_MIME_TYPE, **kwargs)
+
+        if precompress and request is not None:
+            self.precompress(request)
+
+    def precompress(self, request):
+        patch_vary_headers(self, ("Accept-Encoding",))
+        content = self.content
+        if len(content) < MIN_COMPRESS_LENGTH:
+            return
+
+        encoding = accepted_encoding(request)
+        if encoding is None:
+            return
+
+        self.content = get_compressed_content_cache().get(encoding, content)
+        self.headers["Content-Encoding"] = encoding
+        self.headers["Content-Length"] = str(len(self.content))
+
+
+class TurboStreamStreamingResponse(StreamingHttpResponse):
+    """
+    `streaming_content` can be an iterator, or an async iterator on ASGI
+    """
+
     def __init__(self, *args, **kwargs):
-        super().__init__(content_type=TURBO_STREAM_MIME_TYPE, *args, **kwargs)
+        super().__init__(*args, content_type=TURBO_STREAM_MIME_TYPE, **kwargs)
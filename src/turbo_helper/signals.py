@@ -1,52 +1,326 @@
-from django.db.models.signals import post_delete, post_save
+import weakref
+from collections import defaultdict
+from contextvars import ContextVar
+from typing import Iterable, Optional
+
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_init, post_save
+
+# value of deferred field in the snapshot, it is not loaded so we do not know if it changed
+DEFERRED = object()
+
+SNAPSHOT_ATTR = "_turbo_helper_snapshot"
+
+# QuerySet.bulk_update calls QuerySet.update internally
+_in_bulk_update: ContextVar[bool] = ContextVar("_in_bulk_update", default=False)
+
+
+def make_ref(handler_func):
+    if hasattr(handler_func, "__self__"):
+        return weakref.WeakMethod(handler_func)
+    return weakref.ref(handler_func)
+
+
+class SignalHandlerRegistry:
+    """
+    Connect one receiver for each sender and signal, then dispatch to the handlers
+    registered by the decorators.
+
+    If an update handler has `fields`, the values of them are saved as a tuple on the
+    instance at `post_init`, so the handler can be skipped when none of the fields changed.
+    """
+
+    def __init__(self):
+        # (signal, sender) -> [(kind, handler ref, watched attnames)]
+        self.handlers = defaultdict(list)
+        # sender -> ((field name, attname), ...) saved in the snapshot
+        self.tracked_fields = {}
+
+    def register(self, signal, sender, kind, handler_func, fields=None):
+        handler_ref = make_ref(handler_func)
+
+        watched = None
+        if fields is not None:
+            watched = frozenset(self.track_fields(sender, fields))
+
+        key = (signal, sender)
+        if key not in self.handlers:
+            receiver = self.post_save if signal is post_save else self.post_delete
+            signal.connect(
+                receiver,
+                sender=sender,
+                weak=False,
+                dispatch_uid=f"turbo_helper_{id(signal)}_{id(sender)}",
+            )
+        self.handlers[key].append((kind, handler_ref, watched))
+
+    def register_bulk(self, sender, kind, handler_func, fields=None):
+        watched = None
+        if fields is not None:
+            watched = frozenset(sender._meta.get_field(name).attname for name in fields)
+        self.handlers[("bulk", kind, sender)].append(
+            (kind, make_ref(handler_func), watched)
+        )
+
+    def has_bulk_handlers(self, sender, kind):
+        return bool(self.live_handlers(("bulk", kind, sender)))
+
+    def bulk(self, sender, kind, pks, instances=None, fields=None):
+        """
+        Call the bulk handlers once with all the affected rows
+        """
+        changed = None
+        if fields is not None:
+            changed = {sender._meta.get_field(name).attname for name in fields}
+
+        for _kind, handler_func, watched in self.live_handlers(("bulk", kind, sender)):
+            if watched is not None and changed is not None:
+                if not changed.intersection(watched):
+                    continue
+            handler_func(sender=sender, instances=instances, pks=pks, fields=fields)
+
+    def track_fields(self, sender, fields: Iterable[str]):
+        attnames = []
+        tracked = dict(self.tracked_fields.get(sender, ()))
+        for name in fields:
+            attname = sender._meta.get_field(name).attname
+            tracked[name] = attname
+            attnames.append(attname)
+
+        if sender not in self.tracked_fields:
+            post_init.connect(
+                self.post_init,
+                sender=sender,
+                weak=False,
+                dispatch_uid=f"turbo_helper_post_init_{id(sender)}",
+            )
+        self.tracked_fields[sender] = tuple(tracked.items())
+        return attnames
+
+    def take_snapshot(self, sender, instance):
+        # read from __dict__ so deferred fields are not loaded
+        values = instance.__dict__
+        setattr(
+            instance,
+            SNAPSHOT_ATTR,
+            tuple(
+                values.get(attname, DEFERRED)
+                for _name, attname in self.tracked_fields[sender]
+            ),
+        )
+
+    def changed_fields(self, sender, instance, update_fields=None):
+        tracked_fields = self.tracked_fields[sender]
+        snapshot = getattr(instance, SNAPSHOT_ATTR, None)
+        if snapshot is None or len(snapshot) != len(tracked_fields):
+            # tracked fields changed after the instance was loaded
+            snapshot = (DEFERRED,) * len(tracked_fields)
+
+        values = instance.__dict__
+        changed = set()
+        for (name, attname), old_value in zip(tracked_fields, snapshot, strict=True):
+            if (
+                update_fields is not None
+                and name not in update_fields
+                and attname not in update_fields
+            ):
+                continue
+            if old_value is DEFERRED or values.get(attname, DEFERRED) != old_value:
+                changed.add(attname)
+        return changed
+
+    def live_handlers(self, key):
+        handlers = []
+        for kind, handler_ref, watched in self.handlers.get(key, ()):
+            handler_func = handler_ref()
+            if handler_func is not None:
+                handlers.append((kind, handler_func, watched))
+
+        if len(handlers) != len(self.handlers.get(key, ())):
+            # remove handlers which have been garbage collected
+            self.handlers[key] = [
+                item for item in self.handlers[key] if item[1]() is not None
+            ]
+        return handlers
+
+    def post_init(self, sender, instance, **kwargs):
+        self.take_snapshot(sender, instance)
+
+    def post_save(self, sender, instance, created, **kwargs):
+        changed: Optional[set] = None
+        for kind, handler_func, watched in self.live_handlers((post_save, sender)):
+            if kind == "create" and not created:
+                continue
+            if kind == "update":
+                if created:
+                    continue
+                if watched is not None:
+                    if changed is None:
+                        changed = self.changed_fields(
+                            sender, instance, kwargs.get("update_fields")
+                        )
+                    if not changed.intersection(watched):
+                        continue
+
+            handler_func(sender=sender, instance=instance, created=created, **kwargs)
+
+        if sender in self.tracked_fields:
+            # compare with the saved values next time
+            self.take_snapshot(sender, instance)
+
+    def post_delete(self, sender, instance, **kwargs):
+        for _kind, handler_func, _watched in self.live_handlers((post_delete, sender)):
+            handler_func(sender=sender, instance=instance, **kwargs)
+
+
+registry = SignalHandlerRegistry()
+
+
+class BulkSignalQuerySetMixin:
+    """
+    bulk_create, bulk_update and update do not send post_save, this mixin calls the
+    handlers registered by after_bulk_*_commit once per operation.
+
+    delete sends post_delete for each row when there are receivers, so the bulk delete
+    handlers are skipped if the model has after_delete_commit handlers.
+
+    class TodoItem(models.Model):
+        objects = BulkSignalQuerySet.as_manager()
+    """
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = super().bulk_create(objs, *args, **kwargs)
+        if registry.has_bulk_handlers(self.model, "create"):
+            registry.bulk(
+                self.model, "create", pks=[obj.pk for obj in objs], instances=objs
+            )
+        return objs
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        objs = list(objs)
+        token = _in_bulk_update.set(True)
+        try:
+            rows = super().bulk_update(objs, fields, *args, **kwargs)
+        finally:
+            _in_bulk_update.reset(token)
+
+        if registry.has_bulk_handlers(self.model, "update"):
+            registry.bulk(
+                self.model,
+                "update",
+                pks=[obj.pk for obj in objs],
+                instances=objs,
+                fields=list(fields),
+            )
+        return rows
+
+    def update(self, **kwargs):
+        if _in_bulk_update.get() or not registry.has_bulk_handlers(
+            self.model, "update"
+        ):
+            return super().update(**kwargs)
+
+        # rows might not match the filters after update
+        pks = list(self.values_list("pk", flat=True))
+        rows = super().update(**kwargs)
+        registry.bulk(self.model, "update", pks=pks, fields=list(kwargs))
+        return rows
+
+    update.alters_data = True
+
+    def delete(self):
+        # the row handlers are called by post_delete, do not call both
+        has_row_handlers = bool(registry.live_handlers((post_delete, self.model)))
+        if has_row_handlers or not registry.has_bulk_handlers(self.model, "delete"):
+            return super().delete()
+
+        pks = list(self.values_list("pk", flat=True))
+        result = super().delete()
+        registry.bulk(self.model, "delete", pks=pks)
+        return result
+
+    delete.alters_data = True
+    delete.queryset_only = True
+
+
+class BulkSignalQuerySet(BulkSignalQuerySetMixin, QuerySet):
+    pass
 
 
 def after_create_commit(sender):
     def decorator(handler_func):
-        def wrapper(sender, instance, created, **kwargs):
-            if created:
-                handler_func(
-                    sender=sender, instance=instance, created=created, **kwargs
-                )
+        registry.register(post_save, sender, "create", handler_func)
+        return handler_func
+
+    # Return the decorator function
+    return decorator
 
-        # Connect the wrapper function to the post_save signal
-        post_save.connect(wrapper, sender=sender)
 
-        # Return the wrapper function to be used as the signal handler
-        return wrapper
+def after_update_commit(sender, fields: Optional[Iterable[str]] = None):
+    """
+    If `fields` is set, the handler is only called when one of the fields changed
+
+    @after_update_commit(sender=Message, fields=["content"])
+    """
+
+    def decorator(handler_func):
+        registry.register(post_save, sender, "update", handler_func, fields=fields)
+        return handler_func
 
     # Return the decorator function
     return decorator
 
 
-def after_update_commit(sender):
+def after_delete_commit(sender):
     def decorator(handler_func):
-        def wrapper(sender, instance, created, **kwargs):
-            if not created:
-                handler_func(
-                    sender=sender, instance=instance, created=created, **kwargs
-                )
+        registry.register(post_delete, sender, "delete", handler_func)
+        return handler_func
 
-        # Connect the wrapper function to the post_save signal
-        post_save.connect(wrapper, sender=sender)
+    # Return the decorator function
+    return decorator
 
-        # Return the wrapper function to be used as the signal handler
-        return wrapper
 
-    # Return the decorator function
+def after_bulk_create_commit(sender):
+    """
+    Called once after BulkSignalQuerySet.bulk_create
+
+    def handler(sender, instances, pks, **kwargs)
+    """
+
+    def decorator(handler_func):
+        registry.register_bulk(sender, "create", handler_func)
+        return handler_func
+
     return decorator
 
 
-def after_delete_commit(sender):
+def after_bulk_update_commit(sender, fields: Optional[Iterable[str]] = None):
+    """
+    Called once after BulkSignalQuerySet.bulk_update or BulkSignalQuerySet.update
+
+    `instances` is None for update, if `fields` is set, the handler is only called
+    when one of the fields is updated
+
+    def handler(sender, instances, pks, fields, **kwargs)
+    """
+
     def decorator(handler_func):
-        def wrapper(sender, instance, **kwargs):
-            handler_func(sender=sender, instance=instance, **kwargs)
+        registry.register_bulk(sender, "update", handler_func, fields=fields)
+        return handler_func
 
-        # Connect the wrapper function to the post_delete signal
-        post_delete.connect(wrapper, sender=sender)
+    return decorator
 
-        # Return the wrapper function to be used as the signal handler
-        return wrapper
 
-    # Return the decorator function
+def after_bulk_delete_commit(sender):
+    """
+    Called once after BulkSignalQuerySet.delete, unless the model has
+    after_delete_commit handlers, which are called for each row instead
+
+    def handler(sender, pks, **kwargs)
+    """
+
+    def decorator(handler_func):
+        registry.register_bulk(sender, "delete", handler_func)
+        return handler_func
+
     return decorator
@@ -0,0 +1,31 @@
+// Resume <turbo-cable-stream-source> from the last received message after reconnect
+//
+// The server adds `data-sequence` to the turbo stream elements of the streams which
+// have the replay buffer, the last one is saved as `data-last-sequence`, and sent as
+// the `last_sequence` param when the element subscribes again.
+//
+// Load it after @hotwired/turbo-rails
+
+const SEQUENCE_RE = /<turbo-stream data-sequence="(\d+)"/g
+
+customElements.whenDefined("turbo-cable-stream-source").then((element) => {
+  const { dispatchMessageEvent, subscriptionDisconnected } = element.prototype
+
+  element.prototype.dispatchMessageEvent = function (data) {
+    if (typeof data === "string") {
+      for (const match of data.matchAll(SEQUENCE_RE)) {
+        this.dataset.lastSequence = match[1]
+      }
+    }
+    return dispatchMessageEvent.call(this, data)
+  }
+
+  element.prototype.subscriptionDisconnected = function () {
+    subscriptionDisconnected.call(this)
+    if (this.isConnected && this.dataset.lastSequence) {
+      // the subscription params can not be changed, subscribe again with a new
+      // element when the connection is back
+      this.replaceWith(this.cloneNode(true))
+    }
+  }
+})
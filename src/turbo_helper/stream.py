@@ -1,7 +1,212 @@
-from django.template.loader import render_to_string
+import inspect
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Callable, Dict, Optional
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.core.signals import setting_changed
+from django.db import connections
+from django.template.base import Template, TextNode
+from django.template.context import make_context
+from django.template.defaulttags import ForNode
+from django.template.loader import get_template, select_template
+from django.utils.autoreload import file_changed
+from django.utils.safestring import SafeString
+
+from turbo_helper.renderers import (
+    CONTENT_PLACEHOLDER,
+    SLOT_PLACEHOLDER,
+    CompiledTurboStream,
+    render_turbo_stream,
+)
+from turbo_helper.response import TurboStreamResponse, TurboStreamStreamingResponse
+
+ALL_SUFFIX = "_all"
+
+
+def is_django_template(template) -> bool:
+    return isinstance(getattr(template, "template", None), Template)
+
+
+@contextmanager
+def bound_context(template, context=None, request=None):
+    """
+    Same as Template.render of the Django backend, yield the context
+    which is ready to render the nodes
+    """
+    django_template = template.template
+    context = make_context(
+        context, request, autoescape=template.backend.engine.autoescape
+    )
+    with context.render_context.push_state(django_template):
+        with context.bind_template(django_template):
+            context.template_name = django_template.name
+            yield context
+
+
+# set in the threads of the render executor
+render_worker = threading.local()
+
+
+def mark_render_worker():
+    render_worker.active = True
+
+
+@lru_cache(maxsize=None)
+def get_render_executor() -> ThreadPoolExecutor:
+    """
+    Threads shared by the parallel renders, TURBO_HELPER_PARALLEL_RENDER_WORKERS
+    """
+    return ThreadPoolExecutor(
+        max_workers=getattr(settings, "TURBO_HELPER_PARALLEL_RENDER_WORKERS", 4),
+        thread_name_prefix="turbo_helper_render",
+        initializer=mark_render_worker,
+    )
+
+
+def in_atomic_block() -> bool:
+    return any(
+        connection.in_atomic_block
+        for connection in connections.all(initialized_only=True)
+    )
+
+
+def render_node(template, node, context=None, request=None):
+    """
+    Render the node in a worker thread, with its own context
+    """
+    try:
+        with bound_context(template, context, request) as bound:
+            return node.render_annotated(bound)
+    finally:
+        # the worker thread has its own database connections, close them like
+        # close_old_connections does at the end of a request
+        for connection in connections.all(initialized_only=True):
+            connection.close_if_unusable_or_obsolete()
+
+
+def render_nodes_parallel(template, context=None, request=None):
+    nodes = [
+        node for node in template.template.nodelist if not isinstance(node, TextNode)
+    ]
+    if (
+        len(nodes) < 2
+        # the connections of the worker threads can not see uncommitted rows
+        or in_atomic_block()
+        # all workers might be waiting for the nested render
+        or getattr(render_worker, "active", False)
+    ):
+        return template.render(context, request)
+
+    executor = get_render_executor()
+    futures = {
+        node: executor.submit(render_node, template, node, context, request)
+        for node in nodes
+    }
+    with bound_context(template, context, request) as bound:
+        # keep the order of the nodes, text nodes are rendered here
+        return SafeString(
+            "".join(
+                futures[node].result()
+                if node in futures
+                else node.render_annotated(bound)
+                for node in template.template.nodelist
+            )
+        )
+
+
+def iter_node(node, context):
+    """
+    Yield the output of the node, same as rendering it, but `{% for %}` loops
+    yield the nodes of each iteration instead of joining them
+    """
+    if type(node) is not ForNode:
+        yield node.render_annotated(context)
+        return
+
+    # same as ForNode.render
+    parentloop = context["forloop"] if "forloop" in context else {}
+    with context.push():
+        values = node.sequence.resolve(context, ignore_failures=True)
+        if values is None:
+            values = []
+        if not hasattr(values, "__len__"):
+            values = list(values)
+        len_values = len(values)
+        if len_values < 1:
+            for child in node.nodelist_empty:
+                yield from iter_node(child, context)
+            return
+        if node.is_reversed:
+            values = reversed(values)
+        num_loopvars = len(node.loopvars)
+        loop_dict = context["forloop"] = {"parentloop": parentloop}
+        for i, item in enumerate(values):
+            loop_dict["counter0"] = i
+            loop_dict["counter"] = i + 1
+            loop_dict["revcounter"] = len_values - i
+            loop_dict["revcounter0"] = len_values - i - 1
+            loop_dict["first"] = i == 0
+            loop_dict["last"] = i == len_values - 1
+
+            if num_loopvars > 1:
+                try:
+                    len_item = len(item)
+                except TypeError:
+                    len_item = 1
+                if num_loopvars != len_item:
+                    raise ValueError(
+                        f"Need {num_loopvars} values to unpack in for loop; "
+                        f"got {len_item}. "
+                    )
+                with context.push(dict(zip(node.loopvars, item, strict=True))):
+                    for child in node.nodelist_loop:
+                        yield from iter_node(child, context)
+            else:
+                context[node.loopvars[0]] = item
+                for child in node.nodelist_loop:
+                    yield from iter_node(child, context)
+
+
+class TurboStreamAction:
+    """
+    Handlers of an action, and metadata read from their signatures when registered
+
+    `single` handles `target`, `all` handles `targets`, if the action does not have
+    `xxx_all` handler, `targets` is passed to the single handler (turbo_power)
+    """
+
+    __slots__ = ("name", "single", "all", "content", "targets")
+
+    def __init__(self, name, single=None, all=None):
+        self.name = name
+        self.single: Optional[Callable] = single
+        self.all: Optional[Callable] = all or single
+        handlers = [func for func in (single, all) if func is not None]
+        # the action renders content, `remove` does not
+        self.content = any(accepts(func, "content") for func in handlers)
+        # the action supports `targets`
+        self.targets = all is not None or accepts(single, "targets")
+
+
+def accepts(func, name) -> bool:
+    return func is not None and name in inspect.signature(func).parameters
 
-from turbo_helper.renderers import render_turbo_stream
-from turbo_helper.response import TurboStreamResponse
+
+def action_of(handlers: Dict[str, Callable], name) -> Optional[TurboStreamAction]:
+    """
+    Action of the name, built from the `name` and `name_all` handlers
+    """
+    single = handlers.get(name)
+    all = handlers.get(f"{name}{ALL_SUFFIX}")
+    if single is None and all is None:
+        return None
+    return TurboStreamAction(name, single=single, all=all)
 
 
 class TurboStream:
@@ -10,10 +215,134 @@ class TurboStream:
     """
 
     def __init__(self):
+        # registered name -> handler, for example "append" and "append_all"
+        self.handlers: MappingProxyType = MappingProxyType({})
+        # action -> TurboStreamAction, for example "append"
+        self.actions: MappingProxyType = MappingProxyType({})
+        # registered names, same as `handlers`, kept for compatibility
         self.registered_actions = []
+        # template name -> compiled template
+        self.template_cache = {}
 
     def is_registered(self, name):
-        return name in self.registered_actions
+        return name in self.handlers
+
+    def register(self, name, func):
+        """
+        The tables are read only, they are copied and updated when an action is
+        registered, so lookups never see a partially updated table.
+        """
+        if hasattr(self, name):
+            raise AttributeError(
+                f"TurboStream action '{name}' already exists in turbo_stream"
+            )
+        self.update_tables(name, func)
+        self.registered_actions.append(name)
+        setattr(self, name, func)
+
+    def unregister(self, name):
+        self.update_tables(name, None)
+        self.registered_actions.remove(name)
+        delattr(self, name)
+
+    def update_tables(self, name, func):
+        handlers = dict(self.handlers)
+        if func is None:
+            del handlers[name]
+        else:
+            handlers[name] = func
+
+        # the handler is the single handler of `name`, and the `all` handler of
+        # `xxx` if the name is `xxx_all`
+        names = [name]
+        if name.endswith(ALL_SUFFIX):
+            names.append(name[: -len(ALL_SUFFIX)])
+
+        actions = dict(self.actions)
+        for action_name in names:
+            action = action_of(handlers, action_name)
+            if action is None:
+                actions.pop(action_name, None)
+            else:
+                actions[action_name] = action
+
+        self.actions = MappingProxyType(actions)
+        self.handlers = MappingProxyType(handlers)
+
+    def get_template(self, template_name):
+        """
+        Cache compiled templates, so repeated renders skip the template loaders,
+        even when the cached loader is not enabled.
+        """
+        key = (
+            tuple(template_name)
+            if isinstance(template_name, (list, tuple))
+            else template_name
+        )
+        try:
+            return self.template_cache[key]
+        except KeyError:
+            pass
+
+        if isinstance(template_name, (list, tuple)):
+            template = select_template(template_name)
+        else:
+            template = get_template(template_name)
+        self.template_cache[key] = template
+        return template
+
+    def render_template(
+        self, template_name, context=None, request=None, parallel=False
+    ):
+        """
+        Same as render_to_string
+
+        If `parallel` is True, top-level nodes of the template are rendered in threads,
+        they should not depend on each other, for example `{% turbo_stream %}` blocks
+        which run their own queries.
+        """
+        template = self.get_template(template_name)
+        if parallel and is_django_template(template):
+            return render_nodes_parallel(template, context, request)
+        return template.render(context, request)
+
+    def stream_template(self, template_name, context=None, request=None):
+        """
+        Yield the output of each top-level node of the template, for example each
+        `{% turbo_stream %}` block of `message_append.turbo_stream.html`, `{% for %}`
+        loops yield the nodes of each iteration
+
+        Templates of other backends, or which use `{% extends %}`, are rendered at once.
+        """
+        template = self.get_template(template_name)
+        if not is_django_template(template):
+            yield template.render(context, request)
+            return
+
+        with bound_context(template, context, request) as context:
+            for node in template.template.nodelist:
+                for output in iter_node(node, context):
+                    if output:
+                        yield output
+
+    async def astream_template(self, template_name, context=None, request=None):
+        """
+        Async version of stream_template, nodes are rendered in the sync thread,
+        so they can access the database
+        """
+        iterator = self.stream_template(template_name, context, request)
+        next_output = sync_to_async(next)
+        try:
+            while True:
+                output = await next_output(iterator, None)
+                if output is None:
+                    break
+                yield output
+        finally:
+            await sync_to_async(iterator.close)()
+
+    def clear_template_cache(self):
+        self.template_cache.clear()
 
     def action(self, action, target, content=None, **kwargs):
         if not content and kwargs.get("template", None):
@@ -22,7 +351,7 @@ class TurboStream:
             context = kwargs.pop("context", {})
             request = kwargs.pop("request", None)
 
-            content = render_to_string(template, context=context, request=request)
+            content = self.render_template(template, context=context, request=request)
 
         return render_turbo_stream(
             action=action, content=content, target=target, attributes=kwargs
@@ -35,30 +364,99 @@ class TurboStream:
             context = kwargs.pop("context", {})
             request = kwargs.pop("request", None)
 
-            content = render_to_string(template, context=context, request=request)
+            content = self.render_template(template, context=context, request=request)
 
         return render_turbo_stream(
             action=action, content=content, targets=targets, attributes=kwargs
         )
 
+    def compile(
+        self, action, keys=(), targets=False, **attributes
+    ) -> CompiledTurboStream:
+        """
+        Declare the attribute keys of an action once, for actions rendered many times
+
+        redirect_to = turbo_stream.compile("redirect_to", keys=["url", "turbo_frame"])
+        redirect_to(None, "/projects/", "main")
+
+        The element is split from the output of the action handler, `attributes`
+        are passed to the handler and fixed in the element.
+        """
+        handlers = self.actions.get(action)
+        if handlers is None:
+            raise AttributeError(f"TurboStream action '{action}' is not registered")
+        if targets and not handlers.targets:
+            raise ValueError(f"TurboStream action '{action}' does not support targets")
+        handler = handlers.all if targets else handlers.single
+        if handler is None:
+            raise ValueError(f"TurboStream action '{action}' requires targets")
+
+        keys = list(keys)
+        target_name = "targets" if targets else "target"
+        placeholders = {
+            key: SLOT_PLACEHOLDER.format(slot) for slot, key in enumerate(keys, start=1)
+        }
+        if handlers.content:
+            placeholders["content"] = CONTENT_PLACEHOLDER
+        output = handler(
+            **{target_name: SLOT_PLACEHOLDER.format(0)}, **attributes, **placeholders
+        )
+
+        def render(target, *values, content=None):
+            kwargs = dict(attributes, **dict(zip(keys, values, strict=True)))
+            if handlers.content:
+                kwargs["content"] = content
+            return handler(**{target_name: target}, **kwargs)
+
+        return CompiledTurboStream(action, keys, output, render=render)
+
     def response(self, *args, **kwargs):
         """
         Shortcut for TurboStreamResponse
         """
         return TurboStreamResponse(*args, **kwargs)
 
+    def streaming_response(self, template_name, context=None, request=None):
+        """
+        Send each turbo stream of the template as soon as it is rendered
+
+        return turbo_stream.streaming_response(
+            "message_append.turbo_stream.html", {"message": message}, request
+        )
+        """
+        if isinstance(request, ASGIRequest):
+            streaming_content = self.astream_template(template_name, context, request)
+        else:
+            streaming_content = self.stream_template(template_name, context, request)
+        return TurboStreamStreamingResponse(streaming_content)
+
 
 turbo_stream = TurboStream()
 
 
+def reset_template_cache(**kwargs):
+    turbo_stream.clear_template_cache()
+
+
+# template files changed when running the development server
+file_changed.connect(reset_template_cache, dispatch_uid="turbo_helper_template_cache")
+
+
+def reset_template_cache_on_setting_changed(setting, **kwargs):
+    if setting == "TEMPLATES":
+        turbo_stream.clear_template_cache()
+    elif setting == "TURBO_HELPER_PARALLEL_RENDER_WORKERS":
+        if get_render_executor.cache_info().currsize:
+            get_render_executor().shutdown(wait=False)
+        get_render_executor.cache_clear()
+
+
+setting_changed.connect(reset_template_cache_on_setting_changed)
+
+
 def register_turbo_stream_action(name):
     def decorator(func):
-        if hasattr(turbo_stream, name):
-            raise AttributeError(
-                f"TurboStream action '{name}' already exists in turbo_stream"
-            )
-        setattr(turbo_stream, name, func)
-        turbo_stream.registered_actions.append(name)
+        turbo_stream.register(name, func)
         return func
 
     return decorator
@@ -68,32 +466,43 @@ def action_proxy(action, target=None, targets=None, **kwargs):
     """
     https://github.com/marcoroth/turbo_power-rails/issues/35
     """
+    handlers = turbo_stream.actions.get(action)
+    if handlers is None:
+        raise AttributeError(f"TurboStream action '{action}' is not registered")
+
     if target:
-        func = getattr(turbo_stream, f"{action}")
-        return func(
+        if handlers.single is None:
+            raise AttributeError(f"TurboStream action '{action}' requires targets")
+        return handlers.single(
             target=target,
             **kwargs,
         )
     elif targets:
-        func = getattr(turbo_stream, f"{action}_all", None)
-
-        if func:
-            return func(
-                targets=targets,
-                **kwargs,
-            )
-        else:
-            # fallback to pass targets to the single target handler
-            # we do this because of turbo_power
-            func = getattr(turbo_stream, f"{action}")
-            return func(
-                targets=targets,
-                **kwargs,
-            )
+        # `xxx_all` handler, or the single target handler because of turbo_power
+        return handlers.all(
+            targets=targets,
+            **kwargs,
+        )
 
 
 ################################################################################
 
+# Turbo 8 morphs the target instead of replacing it
+MORPH_METHOD = "morph"
+
+
+def morph_attributes(method):
+    """
+    Attributes of replace and update actions, `method` can only be "morph"
+    """
+    if method is None:
+        return {}
+    if method != MORPH_METHOD:
+        raise ValueError(
+            f"Invalid method '{method}', only '{MORPH_METHOD}' is supported"
+        )
+    return {"method": method}
+
 
 @register_turbo_stream_action("append")
 def append(target, content=None, **kwargs):
@@ -121,13 +530,17 @@ def remove(target, **kwargs):
 
 
 @register_turbo_stream_action("replace")
-def replace(target, content=None, **kwargs):
-    return turbo_stream.action("replace", target, content, **kwargs)
+def replace(target, content=None, method=None, **kwargs):
+    return turbo_stream.action(
+        "replace", target, content, **morph_attributes(method), **kwargs
+    )
 
 
 @register_turbo_stream_action("update")
-def update(target, content=None, **kwargs):
-    return turbo_stream.action("update", target, content, **kwargs)
+def update(target, content=None, method=None, **kwargs):
+    return turbo_stream.action(
+        "update", target, content, **morph_attributes(method), **kwargs
+    )
 
 
 ################################################################################
@@ -159,10 +572,14 @@ def remove_all(targets, **kwargs):
 
 
 @register_turbo_stream_action("replace_all")
-def replace_all(targets, content=None, **kwargs):
-    return turbo_stream.action_all("replace", targets, content, **kwargs)
+def replace_all(targets, content=None, method=None, **kwargs):
+    return turbo_stream.action_all(
+        "replace", targets, content, **morph_attributes(method), **kwargs
+    )
 
 
 @register_turbo_stream_action("update_all")
-def update_all(targets, content=None, **kwargs):
-    return turbo_stream.action_all("update", targets, content, **kwargs)
+def update_all(targets, content=None, method=None, **kwargs):
+    return turbo_stream.action_all(
+        "update", targets, content, **morph_attributes(method), **kwargs
+    )
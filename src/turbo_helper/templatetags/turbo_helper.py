@@ -1,9 +1,22 @@
+import re
+import secrets
+from copy import copy
+
 from django import template
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.core.cache.utils import make_template_fragment_key
 from django.template import Node, TemplateSyntaxError
-from django.template.base import token_kwargs
+from django.template.base import kwarg_re, token_kwargs
+from django.utils.safestring import mark_safe
 from template_simplify.templatetags.template_simplify import class_names, dom_id
 
-from turbo_helper.renderers import render_turbo_frame, render_turbo_stream_from
+from turbo_helper.renderers import (
+    render_turbo_frame,
+    render_turbo_stream_from,
+    render_turbo_streams_from,
+)
 from turbo_helper.stream import action_proxy
 
 register = template.Library()
@@ -11,28 +24,154 @@ register = template.Library()
 register.simple_tag(dom_id, name="dom_id")
 register.tag(class_names)
 
+# context variable set by {% turbo_frame_cache %}
+FRAME_CACHE_CONTEXT_KEY = "_turbo_frame_cache"
+
+
+def get_frame_cache():
+    return caches[getattr(settings, "TURBO_HELPER_FRAME_CACHE", DEFAULT_CACHE_ALIAS)]
+
+
+class FrameCacheState:
+    """
+    Cached turbo frames of {% turbo_frame_cache %}, each is rendered as a placeholder
+    and replaced when all of them have been fetched
+    """
+
+    def __init__(self):
+        self.token = secrets.token_hex(8)
+        # (cache key, render the frame, timeout)
+        self.frames = []
+
+    def add(self, cache_key, render, timeout):
+        self.frames.append((cache_key, render, timeout))
+        return f"<!--turbo-frame-cache-{self.token}-{len(self.frames) - 1}-->"
+
+    def placeholder_re(self):
+        return re.compile(rf"<!--turbo-frame-cache-{self.token}-(\d+)-->")
+
+
+def context_snapshot(context):
+    """
+    Copy of the context as it is now, to render the frame later, loops change
+    their variables in place
+    """
+    snapshot = copy(context)
+    snapshot.dicts = [dict(context_dict) for context_dict in context.dicts]
+    for context_dict in snapshot.dicts:
+        if isinstance(context_dict.get("forloop"), dict):
+            context_dict["forloop"] = forloop_snapshot(context_dict["forloop"])
+    # cached frames nested in the frame are fetched by themselves
+    snapshot.update({FRAME_CACHE_CONTEXT_KEY: None})
+    return snapshot
+
+
+def forloop_snapshot(forloop):
+    """
+    ForNode updates `forloop` in place, copy it and its `parentloop` chain
+    """
+    forloop = dict(forloop)
+    if forloop.get("parentloop"):
+        forloop["parentloop"] = forloop_snapshot(forloop["parentloop"])
+    return forloop
+
 
 class TurboFrameTagNode(Node):
     def __init__(self, frame_id, nodelist, extra_context=None):
         self.frame_id = frame_id
         self.nodelist = nodelist
         self.extra_context = extra_context or {}
+        # {% turbo_frame "id" cache=instance.updated_at cache_timeout=300 %}
+        self.cache_version = self.extra_context.pop("cache", None)
+        self.cache_timeout = self.extra_context.pop("cache_timeout", None)
 
     def __repr__(self):
         return "<%s>" % self.__class__.__name__
 
     def render(self, context):
-        children = self.nodelist.render(context)
-
+        frame_id = self.frame_id.resolve(context)
         attributes = {
             key: str(value.resolve(context))
             for key, value in self.extra_context.items()
         }
 
+        cache_version = (
+            self.cache_version.resolve(context)
+            if self.cache_version is not None
+            else None
+        )
+        if cache_version is None:
+            return self.render_frame(context, frame_id, attributes)
+
+        cache_key = make_template_fragment_key(
+            "turbo_frame",
+            [frame_id, cache_version, *sorted(attributes.items())],
+        )
+        timeout = (
+            self.cache_timeout.resolve(context)
+            if self.cache_timeout is not None
+            else DEFAULT_TIMEOUT
+        )
+
+        state = context.get(FRAME_CACHE_CONTEXT_KEY)
+        if state is not None:
+            # {% turbo_frame_cache %} fetches it with the other frames
+            snapshot = context_snapshot(context)
+            return state.add(
+                cache_key,
+                lambda: self.render_frame(snapshot, frame_id, attributes),
+                timeout,
+            )
+
+        value = get_frame_cache().get(cache_key)
+        if value is None:
+            value = self.render_frame(context, frame_id, attributes)
+            get_frame_cache().set(cache_key, value, timeout)
+        return value
+
+    def render_frame(self, context, frame_id, attributes):
         return render_turbo_frame(
-            frame_id=self.frame_id.resolve(context),
+            frame_id=frame_id,
             attributes=attributes,
-            content=children,
+            content=self.nodelist.render(context),
+        )
+
+
+class TurboFrameCacheNode(Node):
+    """
+    Render the content once, the cached turbo frames in it are rendered as
+    placeholders, then fetched in one cache round trip, the missing ones are
+    rendered with a copy of their context and stored.
+    """
+
+    def __init__(self, nodelist):
+        self.nodelist = nodelist
+
+    def __repr__(self):
+        return "<%s>" % self.__class__.__name__
+
+    def render(self, context):
+        state = FrameCacheState()
+        with context.push({FRAME_CACHE_CONTEXT_KEY: state}):
+            output = self.nodelist.render(context)
+        if not state.frames:
+            return output
+
+        cache = get_frame_cache()
+        values = cache.get_many({cache_key for cache_key, _, _ in state.frames})
+        # timeout -> frames to store
+        missing = {}
+        for cache_key, render, timeout in state.frames:
+            if values.get(cache_key) is None:
+                values[cache_key] = render()
+                missing.setdefault(timeout, {})[cache_key] = values[cache_key]
+        for timeout, data in missing.items():
+            cache.set_many(data, timeout)
+
+        return mark_safe(
+            state.placeholder_re().sub(
+                lambda match: values[state.frames[int(match.group(1))][0]], output
+            )
         )
 
 
@@ -69,11 +208,13 @@ class TurboStreamTagNode(Node):
 
 
 class TurboStreamFromTagNode(Node):
-    def __init__(self, stream_name_array):
+    def __init__(self, stream_name_array, extra_context=None, multiple=False):
         """
         TODO: Support override channel
         """
         self.stream_name_array = stream_name_array
+        self.extra_context = extra_context or {}
+        self.multiple = multiple
 
     def __repr__(self):
         return "<%s>" % self.__class__.__name__
@@ -83,7 +224,13 @@ class TurboStreamFromTagNode(Node):
             stream_name.resolve(context) for stream_name in self.stream_name_array
         ]
 
-        return render_turbo_stream_from(stream_name_array)
+        options = {
+            key: value.resolve(context) for key, value in self.extra_context.items()
+        }
+
+        if self.multiple:
+            return render_turbo_streams_from(stream_name_array, **options)
+        return render_turbo_stream_from(stream_name_array, **options)
 
 
 @register.tag("turbo_frame")
@@ -119,6 +266,23 @@ def turbo_frame_tag(parser, token):
     return TurboFrameTagNode(frame_id, nodelist, extra_context=extra_context)
 
 
+@register.tag("turbo_frame_cache")
+def turbo_frame_cache_tag(parser, token):
+    """
+    Fetch the cached turbo frames inside the block with one cache round trip
+
+    {% turbo_frame_cache %}
+      {% for item in items %}
+        {% dom_id item as frame_id %}
+        {% turbo_frame frame_id cache=item.updated_at %}...{% endturbo_frame %}
+      {% endfor %}
+    {% endturbo_frame_cache %}
+    """
+    nodelist = parser.parse(("endturbo_frame_cache",))
+    parser.delete_first_token()
+    return TurboFrameCacheNode(nodelist)
+
+
 @register.tag("turbo_stream")
 def turbo_stream_tag(parser, token):
     args = token.split_contents()
@@ -199,6 +363,20 @@ def turbo_stream_all_tag(parser, token):
     )
 
 
+def parse_stream_from_bits(parser, remaining_bits):
+    # positional arguments build the stream name, keyword arguments are options
+    stream_name_array = []
+    extra_context = {}
+    for bit in remaining_bits:
+        match = kwarg_re.match(bit)
+        if match and match.group(1):
+            key, value = match.groups()
+            extra_context[key] = parser.compile_filter(value)
+        else:
+            stream_name_array.append(parser.compile_filter(bit))
+    return stream_name_array, extra_context
+
+
 @register.tag("turbo_stream_from")
 def turbo_stream_from_tag(parser, token):
     args = token.split_contents()
@@ -208,7 +386,27 @@ def turbo_stream_from_tag(parser, token):
             "'turbo_stream_from' tag requires at least one arguments"
         )
 
-    remaining_bits = args[1:]
-    stream_name_array = [parser.compile_filter(bit) for bit in remaining_bits]
+    stream_name_array, extra_context = parse_stream_from_bits(parser, args[1:])
+
+    return TurboStreamFromTagNode(stream_name_array, extra_context=extra_context)
+
+
+@register.tag("turbo_streams_from")
+def turbo_streams_from_tag(parser, token):
+    """
+    Each positional argument is a stream, which can be a list of streamables
+
+    {% turbo_streams_from "announcements" user_stream chat_stream %}
+    """
+    args = token.split_contents()
+
+    if len(args) < 2:
+        raise TemplateSyntaxError(
+            "'turbo_streams_from' tag requires at least one arguments"
+        )
+
+    stream_name_array, extra_context = parse_stream_from_bits(parser, args[1:])
 
-    return TurboStreamFromTagNode(stream_name_array)
+    return TurboStreamFromTagNode(
+        stream_name_array, extra_context=extra_context, multiple=True
+    )
@@ -4,6 +4,7 @@ https://github.com/marcoroth/turbo_power-rails
 Bring turbo_power to Django
 """
 import json
+from functools import lru_cache
 
 from django.utils.safestring import mark_safe
 
@@ -11,14 +12,15 @@ from turbo_helper import register_turbo_stream_action, turbo_stream
 
 
 def transform_attributes(attributes):
-    transformed_attributes = {}
-    for key, value in attributes.items():
-        transformed_key = transform_key(key)
-        transformed_value = transform_value(value)
-        transformed_attributes[transformed_key] = transformed_value
-    return transformed_attributes
+    return {
+        transform_key(key): value
+        if value is None or type(value) is str
+        else transform_value(value)
+        for key, value in attributes.items()
+    }
 
 
+@lru_cache(maxsize=1024)
 def transform_key(key):
     return str(key).replace("_", "-")
 
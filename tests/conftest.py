@@ -68,5 +68,4 @@ def register_toast_action():
     yield
 
     # cleanup
-    delattr(turbo_stream, "toast")
-    turbo_stream.registered_actions.remove("toast")
+    turbo_stream.unregister("toast")
@@ -0,0 +1,162 @@
+from unittest import mock
+
+import pytest
+
+import turbo_helper.channels.broadcasts
+from tests.testapp.models import TodoItem
+from tests.utils import assert_dom_equal
+from turbo_helper.broadcastable import (
+    broadcasts_refreshes,
+    broadcasts_refreshes_to,
+    broadcasts_to,
+    registry,
+)
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def mock_cable_broadcast(monkeypatch):
+    mock_cable_broadcast = mock.MagicMock(name="cable_broadcast")
+    monkeypatch.setattr(
+        turbo_helper.channels.broadcasts, "cable_broadcast", mock_cable_broadcast
+    )
+    yield mock_cable_broadcast
+
+    # cleanup, the signal handlers are weakly referenced
+    registry.model_broadcasts.pop(TodoItem, None)
+
+
+class TestBroadcastsTo:
+    def test_create_update_delete(self, mock_cable_broadcast):
+        broadcasts_to(lambda instance: ["todo", instance.description[0]])(TodoItem)
+
+        todo_item = TodoItem.objects.create(description="a1")
+        mock_cable_broadcast.assert_called_with(group_name="todo_a", message=mock.ANY)
+        assert_dom_equal(
+            mock_cable_broadcast.call_args.kwargs["message"],
+            f'<turbo-stream action="append" target="todo_items"><template><div id="{todo_item.pk}">a1</div></template></turbo-stream>',
+        )
+
+        todo_item.description = "a2"
+        todo_item.save()
+        mock_cable_broadcast.assert_called_with(group_name="todo_a", message=mock.ANY)
+        assert_dom_equal(
+            mock_cable_broadcast.call_args.kwargs["message"],
+            f'<turbo-stream action="replace" target="todoitem_{todo_item.pk}"><template><div id="{todo_item.pk}">a2</div></template></turbo-stream>',
+        )
+
+        pk = todo_item.pk
+        todo_item.delete()
+        mock_cable_broadcast.assert_called_with(group_name="todo_a", message=mock.ANY)
+        assert_dom_equal(
+            mock_cable_broadcast.call_args.kwargs["message"],
+            f'<turbo-stream action="remove" target="todoitem_{pk}"><template></template></turbo-stream>',
+        )
+
+    def test_options(self, mock_cable_broadcast):
+        broadcasts_to(
+            "description",
+            inserts_by="prepend",
+            target="todo_list",
+            template="simple.html",
+        )(TodoItem)
+
+        TodoItem.objects.create(description="a")
+        mock_cable_broadcast.assert_called_with(group_name="a", message=mock.ANY)
+        assert mock_cable_broadcast.call_args.kwargs["message"].startswith(
+            '<turbo-stream action="prepend" target="todo_list">'
+        )
+
+    def test_bulk_create(self, mock_cable_broadcast):
+        broadcasts_to(lambda instance: ["todo", instance.description[0]])(TodoItem)
+
+        TodoItem.objects.bulk_create(
+            [
+                TodoItem(description="a1"),
+                TodoItem(description="a2"),
+                TodoItem(description="b1"),
+            ]
+        )
+
+        # one message for each stream
+        assert mock_cable_broadcast.call_count == 2
+        messages = {
+            call.kwargs["group_name"]: call.kwargs["message"]
+            for call in mock_cable_broadcast.call_args_list
+        }
+        assert messages["todo_a"].count('<turbo-stream action="append"') == 2
+        assert messages["todo_b"].count('<turbo-stream action="append"') == 1
+
+    def test_morph(self, mock_cable_broadcast):
+        broadcasts_to(lambda instance: "todo", morph=True)(TodoItem)
+
+        todo_item = TodoItem.objects.create(description="a1")
+        assert 'method="morph"' not in mock_cable_broadcast.call_args.kwargs["message"]
+
+        todo_item.save()
+        assert_dom_equal(
+            mock_cable_broadcast.call_args.kwargs["message"],
+            f'<turbo-stream action="replace" target="todoitem_{todo_item.pk}" method="morph"><template><div id="{todo_item.pk}">a1</div></template></turbo-stream>',
+        )
+
+    def test_queryset_update(self, mock_cable_broadcast):
+        todo_item = TodoItem.objects.create(description="a1")
+        broadcasts_to(lambda instance: "todo")(TodoItem)
+
+        TodoItem.objects.filter(pk=todo_item.pk).update(description="a2")
+        mock_cable_broadcast.assert_called_once_with(
+            group_name="todo", message=mock.ANY
+        )
+        assert "a2" in mock_cable_broadcast.call_args.kwargs["message"]
+
+
+class TestBroadcastsRefreshes:
+    def test_broadcasts_refreshes_to(self, mock_cable_broadcast):
+        broadcasts_refreshes_to("description")(TodoItem)
+
+        TodoItem.objects.bulk_create(
+            [TodoItem(description="a"), TodoItem(description="a")]
+        )
+        # one refresh for the stream
+        mock_cable_broadcast.assert_called_once_with(group_name="a", message=mock.ANY)
+        assert 'action="refresh"' in mock_cable_broadcast.call_args.kwargs["message"]
+
+    def test_broadcasts_refreshes(self, mock_cable_broadcast):
+        broadcasts_refreshes()(TodoItem)
+
+        todo_item = TodoItem.objects.create(description="a")
+        mock_cable_broadcast.assert_called_with(
+            group_name="todo_items", message=mock.ANY
+        )
+
+        todo_item.save()
+        mock_cable_broadcast.assert_called_with(
+            group_name=f"todoitem_{todo_item.pk}", message=mock.ANY
+        )
+
+    def test_plural_name_not_translated(self, mock_cable_broadcast, monkeypatch):
+        # a translated verbose_name_plural must not change the stream name
+        monkeypatch.setattr(TodoItem._meta, "verbose_name_plural", "tâches")
+        broadcasts_refreshes()(TodoItem)
+
+        TodoItem.objects.create(description="a")
+        mock_cable_broadcast.assert_called_with(
+            group_name="todo_items", message=mock.ANY
+        )
+
+    def test_morph(self, mock_cable_broadcast):
+        broadcasts_refreshes_to(lambda instance: "todo", morph=True)(TodoItem)
+
+        todo_item = TodoItem.objects.create(description="a")
+        assert 'action="refresh"' in mock_cable_broadcast.call_args.kwargs["message"]
+
+        # morph the updated element instead of refreshing the page
+        todo_item.save()
+        assert_dom_equal(
+            mock_cable_broadcast.call_args.kwargs["message"],
+            f'<turbo-stream action="replace" target="todoitem_{todo_item.pk}" method="morph"><template><div id="{todo_item.pk}">a</div></template></turbo-stream>',
+        )
+
+        todo_item.delete()
+        assert 'action="refresh"' in mock_cable_broadcast.call_args.kwargs["message"]
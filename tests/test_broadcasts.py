@@ -2,6 +2,7 @@ import unittest
 from unittest import mock
 
 import pytest
+from django.utils.safestring import mark_safe
 
 import turbo_helper.channels.broadcasts
 from tests.testapp.models import TodoItem
@@ -12,6 +13,7 @@ from turbo_helper.channels.broadcasts import (
     broadcast_render_to,
     broadcast_stream_to,
 )
+from turbo_helper.channels.diff import get_broadcast_differ
 
 pytestmark = pytest.mark.django_db
 
@@ -49,6 +51,19 @@ class TestBroadcastStreamTo:
             group_name=f"{dom_id(todo_item)}_test", message="hello world"
         )
 
+    def test_broadcast_stream_to_prefix(self, monkeypatch, settings):
+        mock_cable_broadcast = mock.MagicMock(name="cable_broadcast")
+        monkeypatch.setattr(
+            turbo_helper.channels.broadcasts, "cable_broadcast", mock_cable_broadcast
+        )
+        settings.TURBO_HELPER_PREFIX_STREAMS = ["project_*"]
+
+        broadcast_stream_to("project", 42, "tasks", content="hello world")
+
+        assert [
+            call.kwargs["group_name"] for call in mock_cable_broadcast.call_args_list
+        ] == ["project_42_tasks", "project.prefix", "project_42.prefix"]
+
 
 class TestBroadcastActionTo:
     def test_broadcast_action_to(self, monkeypatch):
@@ -86,6 +101,75 @@ class TestBroadcastActionTo:
         )
 
 
+class TestBroadcastActionToDiff:
+    @pytest.fixture
+    def mock_cable_broadcast(self, monkeypatch):
+        get_broadcast_differ.cache_clear()
+        mock_cable_broadcast = mock.MagicMock(name="cable_broadcast")
+        monkeypatch.setattr(
+            turbo_helper.channels.broadcasts, "cable_broadcast", mock_cable_broadcast
+        )
+        yield mock_cable_broadcast
+        get_broadcast_differ.cache_clear()
+
+    def broadcast(self, content):
+        broadcast_action_to(
+            "tasks", action="replace", target="task_1", content=content, diff=True
+        )
+
+    def test_unchanged(self, mock_cable_broadcast):
+        content = mark_safe('<div id="task_1">Test</div>')
+        self.broadcast(content)
+        self.broadcast(content)
+
+        assert mock_cable_broadcast.call_count == 1
+
+    def test_nested_target(self, mock_cable_broadcast):
+        self.broadcast(
+            mark_safe(
+                '<div id="task_1"><h1 id="task_1_title">Old</h1><p>'
+                + "description " * 20
+                + "</p></div>"
+            )
+        )
+        self.broadcast(
+            mark_safe(
+                '<div id="task_1"><h1 id="task_1_title">New</h1><p>'
+                + "description " * 20
+                + "</p></div>"
+            )
+        )
+
+        assert mock_cable_broadcast.call_count == 2
+        assert (
+            mock_cable_broadcast.call_args.kwargs["message"]
+            == '<turbo-stream action="update" target="task_1_title"><template>New</template></turbo-stream>'
+        )
+
+    def test_morph(self, mock_cable_broadcast):
+        self.broadcast(mark_safe('<div id="task_1"><p>Old</p></div>'))
+        self.broadcast(mark_safe('<div id="task_1" class="done"><p>Old</p></div>'))
+
+        assert (
+            mock_cable_broadcast.call_args.kwargs["message"]
+            == '<turbo-stream action="replace" target="task_1" method="morph"><template><div id="task_1" class="done"><p>Old</p></div></template></turbo-stream>'
+        )
+
+    def test_template(self, mock_cable_broadcast):
+        todo_item = TodoItem.objects.create(description="test")
+        for _ in range(2):
+            broadcast_action_to(
+                "tasks",
+                action="update",
+                target="todo_list",
+                template="todoitem.turbo_stream.html",
+                context={"instance": todo_item},
+                diff=True,
+            )
+
+        assert mock_cable_broadcast.call_count == 1
+
+
 class TestBroadcastRenderTo:
     def test_broadcast_render_to(self, monkeypatch):
         mock_cable_broadcast = mock.MagicMock(name="cable_broadcast")
@@ -1,10 +1,34 @@
+import asyncio
+import time
+from io import StringIO
+from urllib.parse import urlencode
+
 import pytest
 from actioncable import ActionCableConsumer, cable_channel_register, compact_encode_json
 from actioncable.utils import async_cable_broadcast
+from asgiref.sync import sync_to_async
+from channels.layers import InMemoryChannelLayer, get_channel_layer
 from channels.testing import WebsocketCommunicator
+from django.core.management import call_command
+from django.template import Context, Template
+from django.test import AsyncRequestFactory
+from django.utils.html import escape
 
-from turbo_helper.channels.stream_name import generate_signed_stream_key
-from turbo_helper.channels.streams_channel import TurboStreamCableChannel
+from turbo_helper import turbo_stream
+from turbo_helper.channels.broadcasts import broadcast_stream_to
+from turbo_helper.channels.consumer import TurboStreamCableConsumer
+from turbo_helper.channels.outbound import OutboundBuffer
+from turbo_helper.channels.relay import CableRelay
+from turbo_helper.channels.replay import InMemoryReplayBuffer, get_replay_buffer
+from turbo_helper.channels.sse import turbo_stream_sse_view
+from turbo_helper.channels.stream_name import (
+    generate_signed_stream_key,
+    generate_signed_stream_names_key,
+    shard_group_name_from,
+    shard_group_names_from,
+    stream_prefix_from,
+)
+from turbo_helper.channels.streams_channel import TurboStreamCableChannel, add_sequence
 
 # register the TurboStreamCableChannel
 cable_channel_register(TurboStreamCableChannel)
@@ -63,3 +87,657 @@ async def test_subscribe():
 
     # Close
     await communicator.disconnect()
+
+
+@pytest.fixture
+def in_memory_channel_layer(settings):
+    settings.CHANNEL_LAYERS = {
+        "default": {"BACKEND": "channels.layers.InMemoryChannelLayer"},
+    }
+
+
+async def async_cable_broadcast_to(channel_layer, group_name, message):
+    await channel_layer.group_send(
+        group_name,
+        {"type": "action_cable_message", "group": group_name, "message": message},
+    )
+
+
+async def connect(consumer_cls):
+    communicator = WebsocketCommunicator(
+        consumer_cls.as_asgi(), "/cable", subprotocols=["actioncable-v1-json"]
+    )
+    connected, subprotocol = await communicator.connect(timeout=10)
+    assert connected
+    response = await communicator.receive_json_from()
+    assert response == {"type": "welcome"}
+    return communicator
+
+
+async def subscribe(communicator, stream_name, prefix=False, **params):
+    param = "signed_stream_prefix" if prefix else "signed_stream_name"
+    subscribe_command = {
+        "command": "subscribe",
+        "identifier": compact_encode_json(
+            {
+                "channel": TurboStreamCableChannel.__name__,
+                param: generate_signed_stream_key(stream_name, prefix=prefix),
+                **params,
+            }
+        ),
+    }
+    await communicator.send_to(text_data=compact_encode_json(subscribe_command))
+
+
+class TestReplayBuffer:
+    def test_since(self):
+        replay_buffer = InMemoryReplayBuffer(streams=["chat_*"], max_size=2)
+
+        assert replay_buffer.handles("chat_1")
+        assert not replay_buffer.handles("todo_1")
+
+        assert replay_buffer.append("chat_1", "a") == 1
+        assert replay_buffer.append("chat_1", "b") == 2
+        assert replay_buffer.append("chat_2", "x") == 1
+
+        assert replay_buffer.since("chat_1", 0) == [(1, "a"), (2, "b")]
+        assert replay_buffer.since("chat_1", 1) == [(2, "b")]
+        assert replay_buffer.since("chat_1", 2) == []
+
+        replay_buffer.append("chat_1", "c")
+        assert replay_buffer.since("chat_1", 1) == [(2, "b"), (3, "c")]
+        # message 1 has been dropped
+        assert replay_buffer.since("chat_1", 0) is None
+
+    def test_get_replay_buffer(self, settings):
+        settings.TURBO_HELPER_REPLAY_BUFFER = None
+        assert get_replay_buffer() is None
+
+        settings.TURBO_HELPER_REPLAY_BUFFER = {"OPTIONS": {"max_size": 5}}
+        replay_buffer = get_replay_buffer()
+        assert isinstance(replay_buffer, InMemoryReplayBuffer)
+        assert replay_buffer.max_size == 5
+        assert get_replay_buffer() is replay_buffer
+
+
+@pytest.mark.asyncio
+async def test_sequence_and_resume(settings, in_memory_channel_layer):
+    settings.TURBO_HELPER_REPLAY_BUFFER = {"OPTIONS": {"streams": ["chat"]}}
+
+    communicator = await connect(TurboStreamCableConsumer)
+    await subscribe(communicator, "chat")
+    response = await communicator.receive_json_from(timeout=10)
+    assert response["type"] == "confirm_subscription"
+
+    await sync_to_async(broadcast_stream_to)(
+        "chat", content=turbo_stream.append("messages", "message 1")
+    )
+    response = await communicator.receive_json_from(timeout=5)
+    # the client reads the sequence from the message
+    assert response["message"] == (
+        '<turbo-stream data-sequence="1" action="append" target="messages">'
+        "<template>message 1</template></turbo-stream>"
+    )
+    assert "sequence" not in response
+    await communicator.disconnect()
+
+    # sent while the client is offline
+    await sync_to_async(broadcast_stream_to)("chat", content="message 2")
+    await sync_to_async(broadcast_stream_to)("chat", content="message 3")
+
+    communicator = await connect(TurboStreamCableConsumer)
+    await subscribe(communicator, "chat", last_sequence=1)
+
+    # the missed messages are sent after the subscription is confirmed
+    response = await communicator.receive_json_from(timeout=5)
+    assert response["type"] == "confirm_subscription"
+    response = await communicator.receive_json_from(timeout=5)
+    assert response["message"] == "message 2"
+    response = await communicator.receive_json_from(timeout=5)
+    assert response["message"] == "message 3"
+
+    await communicator.disconnect()
+
+
+def test_add_sequence():
+    assert add_sequence(turbo_stream.remove("a") + turbo_stream.remove("b"), 3) == (
+        '<turbo-stream data-sequence="3" action="remove" target="a"><template></template></turbo-stream>'
+        '<turbo-stream data-sequence="3" action="remove" target="b"><template></template></turbo-stream>'
+    )
+    assert add_sequence("<turbo-stream-source>", 3) == "<turbo-stream-source>"
+
+
+@pytest.mark.asyncio
+async def test_broadcast_before_replay(settings, in_memory_channel_layer):
+    settings.TURBO_HELPER_REPLAY_BUFFER = {"OPTIONS": {"streams": ["chat"]}}
+    await sync_to_async(broadcast_stream_to)("chat", content="message 1")
+    await sync_to_async(broadcast_stream_to)("chat", content="message 2")
+
+    consumer = TurboStreamCableConsumer()
+    consumer.channel_layer = get_channel_layer()
+    consumer.channel_name = await consumer.channel_layer.new_channel()
+    sent = []
+
+    async def send_json(content, close=False):
+        sent.append(content["message"])
+
+    consumer.send_json = send_json
+    channel = TurboStreamCableChannel(
+        consumer,
+        "a",
+        {"signed_stream_name": generate_signed_stream_key("chat"), "last_sequence": 0},
+    )
+    await channel.subscribe()
+
+    # received between the subscription and the replay
+    await channel.receive_broadcast(
+        {"group": "chat", "message": "message 2", "sequence": 2}
+    )
+    await channel.receive_broadcast(
+        {"group": "chat", "message": "message 3", "sequence": 3}
+    )
+    assert sent == []
+
+    await channel.replay()
+    assert sent == ["message 1", "message 2", "message 3"]
+
+
+@pytest.mark.asyncio
+async def test_relay_broadcast_during_subscribe(
+    settings, in_memory_channel_layer, monkeypatch
+):
+    settings.TURBO_HELPER_CABLE_RELAY = True
+    settings.TURBO_HELPER_REPLAY_BUFFER = {"OPTIONS": {"streams": ["chat"]}}
+    await sync_to_async(broadcast_stream_to)("chat", content="message 1")
+    await sync_to_async(broadcast_stream_to)("chat", content="message 2")
+
+    original_join = CableRelay.join
+
+    async def join(self, group_name, cable_channel_instance):
+        await original_join(self, group_name, cable_channel_instance)
+        # the receive loop of the relay runs as soon as the relay joined the group
+        await cable_channel_instance.receive_broadcast(
+            {"group": group_name, "message": "message 3", "sequence": 3}
+        )
+
+    monkeypatch.setattr(CableRelay, "join", join)
+
+    consumer = TurboStreamCableConsumer()
+    consumer.channel_layer = get_channel_layer()
+    sent = []
+
+    async def send_json(content, close=False):
+        sent.append(content["message"])
+
+    consumer.send_json = send_json
+    channel = TurboStreamCableChannel(
+        consumer,
+        "a",
+        {"signed_stream_name": generate_signed_stream_key("chat"), "last_sequence": 0},
+    )
+    await channel.subscribe()
+    # nothing is sent before confirm_subscription
+    assert sent == []
+
+    await channel.replay()
+    assert sent == ["message 1", "message 2", "message 3"]
+    channel.relay.stop()
+
+
+@pytest.mark.asyncio
+async def test_resume_refresh_when_missed_messages_dropped(
+    settings, in_memory_channel_layer
+):
+    settings.TURBO_HELPER_REPLAY_BUFFER = {"OPTIONS": {"max_size": 1}}
+
+    await sync_to_async(broadcast_stream_to)("chat", content="message 1")
+    await sync_to_async(broadcast_stream_to)("chat", content="message 2")
+
+    communicator = await connect(TurboStreamCableConsumer)
+    await subscribe(communicator, "chat", last_sequence=0)
+
+    response = await communicator.receive_json_from(timeout=5)
+    assert response["type"] == "confirm_subscription"
+    response = await communicator.receive_json_from(timeout=5)
+    assert 'action="refresh"' in response["message"]
+
+    await communicator.disconnect()
+
+
+class TestOutboundBuffer:
+    def test_coalesce(self):
+        outbound_buffer = OutboundBuffer()
+        outbound_buffer.push(turbo_stream.update("counter", "1"), sequence=1)
+        outbound_buffer.push(turbo_stream.append("list", "a"), sequence=2)
+        outbound_buffer.push(turbo_stream.update("counter", "2"), sequence=3)
+        outbound_buffer.push(turbo_stream.append("list", "b"), sequence=4)
+        outbound_buffer.push(turbo_stream.replace("counter", "3"), sequence=5)
+
+        frames, sequence = outbound_buffer.drain()
+        assert frames == [
+            turbo_stream.append("list", "a")
+            + turbo_stream.append("list", "b")
+            + turbo_stream.replace("counter", "3")
+        ]
+        assert sequence == 5
+        assert len(outbound_buffer) == 0
+
+    def test_replace_is_not_superseded_by_update(self):
+        outbound_buffer = OutboundBuffer()
+        outbound_buffer.push(turbo_stream.replace("counter", "1"))
+        outbound_buffer.push(turbo_stream.update("counter", "2"))
+        assert len(outbound_buffer) == 2
+
+    def test_attribute_order(self):
+        outbound_buffer = OutboundBuffer()
+        outbound_buffer.push(
+            '<turbo-stream target="counter" action="update"><template>1</template></turbo-stream>'
+        )
+        outbound_buffer.push(turbo_stream.update("counter", "2"))
+        frames, sequence = outbound_buffer.drain()
+        assert frames == [turbo_stream.update("counter", "2")]
+
+    def test_dict_message(self):
+        outbound_buffer = OutboundBuffer()
+        outbound_buffer.push("a")
+        outbound_buffer.push({"key": "value"})
+        outbound_buffer.push("b")
+        outbound_buffer.push("c")
+
+        frames, sequence = outbound_buffer.drain()
+        assert frames == ["a", {"key": "value"}, "bc"]
+        assert sequence is None
+
+    def test_overflow(self):
+        outbound_buffer = OutboundBuffer(max_size=2)
+        for i in range(3):
+            outbound_buffer.push(turbo_stream.append("list", str(i)))
+
+        frames, sequence = outbound_buffer.drain()
+        assert len(frames) == 1
+        assert 'action="refresh"' in frames[0]
+
+
+@pytest.mark.asyncio
+async def test_outbound_buffer(settings, in_memory_channel_layer):
+    settings.TURBO_HELPER_CABLE_OUTBOUND_BUFFER = {"flush_interval": 0.1}
+
+    communicator = await connect(TurboStreamCableConsumer)
+    await subscribe(communicator, "test")
+    response = await communicator.receive_json_from(timeout=10)
+    assert response["type"] == "confirm_subscription"
+
+    await async_cable_broadcast("test", turbo_stream.update("counter", "1"))
+    await async_cable_broadcast("test", turbo_stream.update("counter", "2"))
+    await async_cable_broadcast("test", turbo_stream.append("list", "a"))
+
+    response = await communicator.receive_json_from(timeout=5)
+    assert response["message"] == turbo_stream.update(
+        "counter", "2"
+    ) + turbo_stream.append("list", "a")
+    assert await communicator.receive_nothing() is True
+
+    await communicator.disconnect()
+
+
+@pytest.mark.asyncio
+async def test_outbound_flush_failure(settings, in_memory_channel_layer, caplog):
+    consumer = TurboStreamCableConsumer()
+
+    async def send_json(content, close=False):
+        raise ConnectionError("closed")
+
+    consumer.send_json = send_json
+    settings.TURBO_HELPER_CABLE_OUTBOUND_BUFFER = {"max_size": 10}
+    channel = TurboStreamCableChannel(consumer, "a")
+    await channel.send_message(turbo_stream.update("counter", "1"))
+    flush_task = channel.flush_task
+    await asyncio.wait([flush_task])
+    # let the done callback run
+    await asyncio.sleep(0)
+
+    assert channel.flush_task is None
+    assert "Failed to send buffered messages" in caplog.text
+
+
+@pytest.mark.asyncio
+async def test_prefix_subscribe(settings, in_memory_channel_layer):
+    settings.TURBO_HELPER_PREFIX_STREAMS = ["project_*"]
+
+    communicator = await connect(ActionCableConsumer)
+    # signed as a stream name, it is not a prefix subscription
+    await subscribe(communicator, stream_prefix_from("project", 43))
+    response = await communicator.receive_json_from(timeout=10)
+    assert response["type"] == "confirm_subscription"
+
+    await subscribe(communicator, stream_prefix_from("project", 42), prefix=True)
+    response = await communicator.receive_json_from(timeout=10)
+    assert response["type"] == "confirm_subscription"
+
+    await sync_to_async(broadcast_stream_to)("project", 42, "tasks", content="a")
+    await sync_to_async(broadcast_stream_to)("project", 42, "notes", 1, content="b")
+    await sync_to_async(broadcast_stream_to)("project", 43, "tasks", content="c")
+
+    response = await communicator.receive_json_from(timeout=5)
+    assert response["message"] == "a"
+    response = await communicator.receive_json_from(timeout=5)
+    assert response["message"] == "b"
+    assert await communicator.receive_nothing() is True
+
+    await communicator.disconnect()
+
+
+def test_shard_group_names(settings):
+    settings.TURBO_HELPER_SHARDED_STREAMS = {"announcements": 4}
+
+    assert shard_group_names_from("announcements") == [
+        "announcements.shard0",
+        "announcements.shard1",
+        "announcements.shard2",
+        "announcements.shard3",
+    ]
+    assert shard_group_names_from("chat_1") == ["chat_1"]
+    assert shard_group_name_from("chat_1", "channel") == "chat_1"
+    assert shard_group_name_from("announcements", "channel") in shard_group_names_from(
+        "announcements"
+    )
+
+
+@pytest.mark.asyncio
+async def test_sharded_stream(settings, in_memory_channel_layer):
+    settings.TURBO_HELPER_SHARDED_STREAMS = {"announce*": 4}
+    settings.TURBO_HELPER_REPLAY_BUFFER = {"OPTIONS": {"streams": ["announcements"]}}
+
+    communicators = []
+    for consumer_cls in [ActionCableConsumer, TurboStreamCableConsumer] * 4:
+        communicator = await connect(consumer_cls)
+        await subscribe(communicator, "announcements")
+        response = await communicator.receive_json_from(timeout=10)
+        assert response["type"] == "confirm_subscription"
+        communicators.append(communicator)
+
+    await sync_to_async(broadcast_stream_to)("announcements", content="message 1")
+    for communicator in communicators:
+        response = await communicator.receive_json_from(timeout=5)
+        assert response["message"] == "message 1"
+        await communicator.disconnect()
+
+    await sync_to_async(broadcast_stream_to)("announcements", content="message 2")
+
+    # resume from the replay buffer, the message is not sent again from the shard
+    communicator = await connect(TurboStreamCableConsumer)
+    await subscribe(communicator, "announcements", last_sequence=1)
+    response = await communicator.receive_json_from(timeout=5)
+    assert response["type"] == "confirm_subscription"
+    response = await communicator.receive_json_from(timeout=5)
+    assert response["message"] == "message 2"
+
+    await sync_to_async(broadcast_stream_to)("announcements", content="message 3")
+    response = await communicator.receive_json_from(timeout=5)
+    assert response["message"] == "message 3"
+    assert await communicator.receive_nothing() is True
+
+    await communicator.disconnect()
+
+
+@pytest.mark.asyncio
+async def test_relay(settings, in_memory_channel_layer):
+    settings.TURBO_HELPER_CABLE_RELAY = True
+    channel_layer = get_channel_layer()
+
+    communicators = []
+    for _ in range(3):
+        communicator = await connect(TurboStreamCableConsumer)
+        await subscribe(communicator, "chat")
+        response = await communicator.receive_json_from(timeout=10)
+        assert response["type"] == "confirm_subscription"
+        communicators.append(communicator)
+
+    # the process joins the group once
+    assert len(channel_layer.groups["chat"]) == 1
+
+    await sync_to_async(broadcast_stream_to)("chat", content="message 1")
+    for communicator in communicators:
+        response = await communicator.receive_json_from(timeout=5)
+        assert response["message"] == "message 1"
+
+    await communicators[0].disconnect()
+    await sync_to_async(broadcast_stream_to)("chat", content="message 2")
+    for communicator in communicators[1:]:
+        response = await communicator.receive_json_from(timeout=5)
+        assert response["message"] == "message 2"
+        await communicator.disconnect()
+
+    # left the group with the last subscription
+    assert "chat" not in channel_layer.groups
+
+
+class SlowChannelLayer(InMemoryChannelLayer):
+    """
+    Round trips of a real channel layer, group_discard takes longer than group_add
+    """
+
+    async def group_add(self, group, channel):
+        await asyncio.sleep(0.01)
+        await super().group_add(group, channel)
+
+    async def group_discard(self, group, channel):
+        await asyncio.sleep(0.02)
+        await super().group_discard(group, channel)
+
+
+class RelaySubscriber:
+    def __init__(self):
+        self.messages = []
+
+    async def receive_broadcast(self, event):
+        self.messages.append(event["message"])
+
+
+@pytest.mark.asyncio
+async def test_relay_join_after_leave():
+    relay = CableRelay(SlowChannelLayer())
+    subscriber_a, subscriber_b = RelaySubscriber(), RelaySubscriber()
+    await relay.subscribe(["chat"], subscriber_a)
+
+    # the pending group_discard of a must not remove the relay joined for b
+    await asyncio.gather(
+        relay.unsubscribe(["chat"], subscriber_a),
+        relay.subscribe(["chat"], subscriber_b),
+    )
+    assert relay.channel_name in relay.channel_layer.groups["chat"]
+    assert relay.locks == {}
+
+    await async_cable_broadcast_to(relay.channel_layer, "chat", "message")
+    await asyncio.sleep(0.05)
+    assert subscriber_b.messages == ["message"]
+    relay.stop()
+
+
+@pytest.mark.asyncio
+async def test_relay_refresh_group():
+    relay = CableRelay(InMemoryChannelLayer())
+    relay.refresh_interval = 0.05
+    subscriber = RelaySubscriber()
+    await relay.subscribe(["chat"], subscriber)
+
+    # joined long ago, the channel layer would drop it on the next clean
+    groups = relay.channel_layer.groups
+    groups["chat"][relay.channel_name] = (
+        time.time() - 2 * relay.channel_layer.group_expiry
+    )
+    await asyncio.sleep(0.1)
+
+    await async_cable_broadcast_to(relay.channel_layer, "chat", "message")
+    await asyncio.sleep(0.05)
+    assert subscriber.messages == ["message"]
+    relay.stop()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "consumer_cls", [ActionCableConsumer, TurboStreamCableConsumer]
+)
+async def test_subscribe_multiple_streams(consumer_cls, in_memory_channel_layer):
+    communicator = await connect(consumer_cls)
+    identifier = compact_encode_json(
+        {
+            "channel": TurboStreamCableChannel.__name__,
+            "signed_stream_name": None,
+            "signed_stream_names": generate_signed_stream_names_key(["a", "b"]),
+        }
+    )
+    await communicator.send_to(
+        text_data=compact_encode_json(
+            {"command": "subscribe", "identifier": identifier}
+        )
+    )
+    response = await communicator.receive_json_from(timeout=10)
+    assert response["type"] == "confirm_subscription"
+
+    await async_cable_broadcast("a", "message a")
+    response = await communicator.receive_json_from(timeout=5)
+    assert response["message"] == "message a"
+
+    await async_cable_broadcast("b", "message b")
+    response = await communicator.receive_json_from(timeout=5)
+    assert response["message"] == "message b"
+
+    await communicator.send_to(
+        text_data=compact_encode_json(
+            {"command": "unsubscribe", "identifier": identifier}
+        )
+    )
+    await async_cable_broadcast("a", "message a")
+    await async_cable_broadcast("b", "message b")
+    assert await communicator.receive_nothing() is True
+
+    await communicator.disconnect()
+
+
+@pytest.mark.asyncio
+async def test_sse(settings, in_memory_channel_layer):
+    settings.TURBO_HELPER_REPLAY_BUFFER = {"OPTIONS": {"streams": ["chat"]}}
+    await sync_to_async(broadcast_stream_to)("chat", content="message 1")
+
+    request = AsyncRequestFactory().get(
+        "/turbo-streams/",
+        {"signed_stream_name": generate_signed_stream_key("chat")},
+        headers={"Last-Event-ID": "0"},
+    )
+    response = await turbo_stream_sse_view(request)
+    assert response["Content-Type"] == "text/event-stream"
+
+    events = aiter(response.streaming_content)
+    assert await anext(events) == b": connected\n\n"
+    # replayed from Last-Event-ID
+    assert await anext(events) == b"id: 1\ndata: message 1\n\n"
+
+    await sync_to_async(broadcast_stream_to)("chat", content="message\n2")
+    assert await asyncio.wait_for(anext(events), 5) == (
+        b"id: 2\ndata: message\ndata: 2\n\n"
+    )
+    await events.aclose()
+
+
+@pytest.mark.asyncio
+async def test_sse_multiple_streams(settings, in_memory_channel_layer):
+    settings.TURBO_HELPER_REPLAY_BUFFER = {"OPTIONS": {"streams": ["a", "b"]}}
+    await sync_to_async(broadcast_stream_to)("a", content="a1")
+    await sync_to_async(broadcast_stream_to)("a", content="a2")
+    await sync_to_async(broadcast_stream_to)("b", content="b1")
+
+    request = AsyncRequestFactory().get(
+        "/turbo-streams/",
+        {"signed_stream_names": generate_signed_stream_names_key(["a", "b"])},
+        headers={"Last-Event-ID": "a=1&b=0"},
+    )
+    response = await turbo_stream_sse_view(request)
+
+    events = aiter(response.streaming_content)
+    assert await anext(events) == b": connected\n\n"
+    # each stream is replayed from its own sequence
+    assert await anext(events) == b"id: a=2&b=0\ndata: a2\n\n"
+    assert await anext(events) == b"id: a=2&b=1\ndata: b1\n\n"
+
+    # b2 has a lower sequence than a3, but it is not dropped
+    await sync_to_async(broadcast_stream_to)("a", content="a3")
+    assert await asyncio.wait_for(anext(events), 5) == b"id: a=3&b=1\ndata: a3\n\n"
+    await sync_to_async(broadcast_stream_to)("b", content="b2")
+    assert await asyncio.wait_for(anext(events), 5) == b"id: a=3&b=2\ndata: b2\n\n"
+    await events.aclose()
+
+
+@pytest.mark.asyncio
+async def test_sse_invalid_signature(in_memory_channel_layer):
+    request = AsyncRequestFactory().get(
+        "/turbo-streams/", {"signed_stream_name": "chat:invalid"}
+    )
+    response = await turbo_stream_sse_view(request)
+    assert response.status_code == 403
+
+
+def test_sse_stream_source():
+    output = Template(
+        '{% load turbo_helper %}{% turbo_stream_from "chat" 1 transport="sse" %}'
+    ).render(Context({}))
+    query = urlencode({"signed_stream_name": generate_signed_stream_key("chat_1")})
+    assert output == (
+        f'<turbo-stream-source src="/turbo-streams/?{escape(query)}"></turbo-stream-source>'
+    )
+
+
+@pytest.mark.asyncio
+async def test_channel_footprint(in_memory_channel_layer):
+    signed_stream_name = generate_signed_stream_key("chat_1")
+    consumer = TurboStreamCableConsumer()
+    consumer.channel_layer = get_channel_layer()
+    consumer.channel_name = await consumer.channel_layer.new_channel()
+
+    channels = []
+    for identifier_key in ("a", "b"):
+        channel = TurboStreamCableChannel(
+            consumer, identifier_key, {"signed_stream_name": signed_stream_name}
+        )
+        await channel.subscribe()
+        channels.append(channel)
+
+    # subscriptions of the same stream share the interned name
+    assert channels[0].stream_names[0] is channels[1].stream_names[0]
+    assert channels[0].group_names is channels[0].stream_names
+    assert channels[0].last_sequences is None
+
+
+def test_loadtest_command():
+    stdout = StringIO()
+    call_command(
+        "turbo_helper_loadtest",
+        subscribers=20,
+        streams=2,
+        broadcasts=4,
+        rate=0,
+        stdout=stdout,
+    )
+    assert "delivered:    40/40" in stdout.getvalue()
+
+
+@pytest.mark.parametrize(
+    "overrides",
+    [
+        {"TURBO_HELPER_REPLAY_BUFFER": {"OPTIONS": {"streams": ["loadtest_*"]}}},
+        {"TURBO_HELPER_CABLE_OUTBOUND_BUFFER": {"flush_interval": 0.01}},
+    ],
+)
+def test_loadtest_project_settings(settings, overrides):
+    # frames have data-sequence, or many broadcasts merged in one frame
+    for name, value in overrides.items():
+        setattr(settings, name, value)
+    stdout = StringIO()
+    call_command(
+        "turbo_helper_loadtest",
+        subscribers=10,
+        broadcasts=5,
+        rate=0,
+        stdout=stdout,
+    )
+    assert "delivered:    50/50" in stdout.getvalue()
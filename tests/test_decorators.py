@@ -0,0 +1,51 @@
+from django.http import HttpResponse
+
+from turbo_helper import turbo_frame_condition
+
+
+class TestTurboFrameCondition:
+    def test_etag(self, rf):
+        calls = []
+
+        @turbo_frame_condition(lambda request, pk: f"version_{pk}")
+        def view(request, pk):
+            calls.append(pk)
+            return HttpResponse("OK")
+
+        response = view(rf.get("/", HTTP_TURBO_FRAME="task_1"), pk=1)
+        assert response.status_code == 200
+        assert response.headers["Vary"] == "Turbo-Frame"
+        etag = response.headers["ETag"]
+        assert calls == [1]
+
+        # same frame and version
+        response = view(
+            rf.get("/", HTTP_TURBO_FRAME="task_1", HTTP_IF_NONE_MATCH=etag), pk=1
+        )
+        assert response.status_code == 304
+        assert response.headers["Vary"] == "Turbo-Frame"
+        assert calls == [1]
+
+        # another frame
+        response = view(
+            rf.get("/", HTTP_TURBO_FRAME="task_2", HTTP_IF_NONE_MATCH=etag), pk=1
+        )
+        assert response.status_code == 200
+        assert response.headers["ETag"] != etag
+        assert calls == [1, 1]
+
+        # another version
+        response = view(
+            rf.get("/", HTTP_TURBO_FRAME="task_1", HTTP_IF_NONE_MATCH=etag), pk=2
+        )
+        assert response.status_code == 200
+        assert calls == [1, 1, 2]
+
+    def test_no_version(self, rf):
+        @turbo_frame_condition(lambda request: None)
+        def view(request):
+            return HttpResponse("OK")
+
+        response = view(rf.get("/", HTTP_TURBO_FRAME="task_1"))
+        assert response.status_code == 200
+        assert "ETag" not in response.headers
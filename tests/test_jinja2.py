@@ -0,0 +1,81 @@
+import jinja2
+import pytest
+
+from tests.test_tags import render
+from turbo_helper.jinja2 import TurboHelperExtension
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def environment():
+    return jinja2.Environment(extensions=[TurboHelperExtension], autoescape=True)
+
+
+def render_jinja2(environment, template, context):
+    return environment.from_string(template).render(context)
+
+
+class TestTurboHelperExtension:
+    def test_turbo_frame(self, environment):
+        output = render_jinja2(
+            environment,
+            '{% turbo_frame "test", src="/test/", data_turbo_action=True %}<p>{{ msg }}</p>{% endturbo_frame %}',
+            {"msg": "<hello>"},
+        )
+        assert output == render(
+            '{% load turbo_helper %}{% turbo_frame "test" src="/test/" data_turbo_action=True %}<p>{{ msg }}</p>{% endturbo_frame %}',
+            {"msg": "<hello>"},
+        )
+
+    def test_turbo_stream(self, environment):
+        output = render_jinja2(
+            environment,
+            '{% turbo_stream "append" dom_id(todo) method="morph" %}<p>{{ msg }}</p>{% endturbo_stream %}',
+            {"msg": "<hello>", "todo": "todo_1"},
+        )
+        assert output == render(
+            '{% load turbo_helper %}{% turbo_stream "append" todo method="morph" %}<p>{{ msg }}</p>{% endturbo_stream %}',
+            {"msg": "<hello>", "todo": "todo_1"},
+        )
+
+    def test_turbo_stream_all(self, environment):
+        output = render_jinja2(
+            environment,
+            '{% turbo_stream_all "remove", ".old_records" %}{% endturbo_stream_all %}',
+            {},
+        )
+        assert (
+            output
+            == '<turbo-stream action="remove" targets=".old_records"><template></template></turbo-stream>'
+        )
+
+    def test_turbo_stream_from(self, environment):
+        output = render_jinja2(
+            environment, '{% turbo_stream_from "test", dom_id %}', {"dom_id": "todo_3"}
+        )
+        assert output == render(
+            '{% load turbo_helper %}{% turbo_stream_from "test" dom_id %}',
+            {"dom_id": "todo_3"},
+        )
+
+        output = render_jinja2(
+            environment,
+            '{% turbo_streams_from "announcements", ["chat", dom_id] %}',
+            {"dom_id": "todo_3"},
+        )
+        assert output == render(
+            '{% load turbo_helper %}{% turbo_streams_from "announcements" chat_stream %}',
+            {"chat_stream": ["chat", "todo_3"]},
+        )
+
+    def test_globals(self, environment):
+        output = render_jinja2(
+            environment,
+            "{{ turbo_stream.update(dom_id(todo), '<b>ok</b>') }}",
+            {"todo": "todo_1"},
+        )
+        assert (
+            output
+            == '<turbo-stream action="update" target="todo_1"><template>&lt;b&gt;ok&lt;/b&gt;</template></turbo-stream>'
+        )
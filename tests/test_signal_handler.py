@@ -2,6 +2,9 @@ import pytest
 
 from tests.testapp.models import TodoItem
 from turbo_helper.signals import (
+    after_bulk_create_commit,
+    after_bulk_delete_commit,
+    after_bulk_update_commit,
     after_create_commit,
     after_delete_commit,
     after_update_commit,
@@ -88,3 +91,141 @@ class TestSignalHandler:
 
         assert handler_called_1
         assert handler_called_2
+
+    def test_after_update_commit_fields(self):
+        calls = []
+
+        def handler_func(sender, instance, created, **kwargs):
+            calls.append(instance.description)
+
+        decorated_handler = after_update_commit(  # noqa: F841
+            sender=TodoItem, fields=["description"]
+        )(handler_func)
+
+        todo_item = TodoItem.objects.create(description="Test Model")
+        assert calls == []
+
+        # nothing changed
+        todo_item.save()
+        assert calls == []
+
+        todo_item.description = "test"
+        todo_item.save()
+        assert calls == ["test"]
+
+        # compare with the last saved value
+        todo_item.save()
+        assert calls == ["test"]
+
+        # field is not in update_fields
+        todo_item.description = "test 2"
+        todo_item.save(update_fields=[])
+        assert calls == ["test"]
+
+        # loaded from database
+        todo_item = TodoItem.objects.get(pk=todo_item.pk)
+        todo_item.save()
+        assert calls == ["test"]
+        todo_item.description = "test 3"
+        todo_item.save()
+        assert calls == ["test", "test 3"]
+
+    def test_after_update_commit_deferred_fields(self):
+        calls = []
+
+        def handler_func(sender, instance, created, **kwargs):
+            calls.append(instance.pk)
+
+        decorated_handler = after_update_commit(  # noqa: F841
+            sender=TodoItem, fields=["description"]
+        )(handler_func)
+
+        todo_item = TodoItem.objects.create(description="Test Model")
+
+        # deferred field is not loaded, so we treat it as changed
+        todo_item = TodoItem.objects.only("pk").get(pk=todo_item.pk)
+        todo_item.save()
+        assert calls == [todo_item.pk]
+
+
+class TestBulkSignalHandler:
+    def test_after_bulk_create_commit(self):
+        calls = []
+
+        def handler_func(sender, instances, pks, **kwargs):
+            calls.append((instances, pks))
+
+        decorated_handler = after_bulk_create_commit(sender=TodoItem)(  # noqa: F841
+            handler_func
+        )
+
+        todo_items = TodoItem.objects.bulk_create(
+            [TodoItem(description="a"), TodoItem(description="b")]
+        )
+
+        assert calls == [(todo_items, [todo_item.pk for todo_item in todo_items])]
+
+    def test_after_bulk_update_commit(self):
+        calls = []
+
+        def handler_func(sender, instances, pks, fields, **kwargs):
+            calls.append((instances, pks, fields))
+
+        decorated_handler = after_bulk_update_commit(  # noqa: F841
+            sender=TodoItem, fields=["description"]
+        )(handler_func)
+
+        todo_item_1 = TodoItem.objects.create(description="a")
+        todo_item_2 = TodoItem.objects.create(description="b")
+
+        todo_item_1.description = "c"
+        TodoItem.objects.bulk_update([todo_item_1], ["description"])
+        assert calls == [([todo_item_1], [todo_item_1.pk], ["description"])]
+
+        calls.clear()
+        TodoItem.objects.filter(pk=todo_item_2.pk).update(description="d")
+        assert calls == [(None, [todo_item_2.pk], ["description"])]
+
+        # no watched field updated
+        calls.clear()
+        TodoItem.objects.filter(pk=todo_item_2.pk).update(id=todo_item_2.pk)
+        assert calls == []
+
+    def test_after_bulk_delete_commit(self):
+        calls = []
+
+        def handler_func(sender, pks, **kwargs):
+            calls.append(pks)
+
+        decorated_handler = after_bulk_delete_commit(sender=TodoItem)(  # noqa: F841
+            handler_func
+        )
+
+        todo_item_1 = TodoItem.objects.create(description="a")
+        todo_item_2 = TodoItem.objects.create(description="b")
+        pks = [todo_item_1.pk, todo_item_2.pk]
+
+        TodoItem.objects.filter(pk__in=pks).delete()
+        assert calls == [pks]
+        assert not TodoItem.objects.filter(pk__in=pks).exists()
+
+    def test_bulk_delete_with_row_handler(self):
+        calls = []
+
+        def row_handler(sender, instance, **kwargs):
+            calls.append(("row", instance.pk))
+
+        def bulk_handler(sender, pks, **kwargs):
+            calls.append(("bulk", pks))
+
+        decorated_handler = after_delete_commit(sender=TodoItem)(  # noqa: F841
+            row_handler
+        )
+        decorated_handler_2 = after_bulk_delete_commit(sender=TodoItem)(  # noqa: F841
+            bulk_handler
+        )
+
+        todo_items = [TodoItem.objects.create(description=c) for c in "ab"]
+        TodoItem.objects.all().delete()
+        # post_delete is sent for each row, the bulk handler is not called as well
+        assert sorted(calls) == sorted(("row", item.pk) for item in todo_items)
@@ -1,10 +1,28 @@
+import gzip
+import os
+import subprocess
+import sys
+import threading
+from pathlib import Path
+from unittest import mock
+
+import pytest
+from django.db import transaction
 from django.http import HttpRequest
+from django.middleware.gzip import GZipMiddleware
+from django.template import engines
+from django.test import AsyncRequestFactory
+from django.utils.autoreload import file_changed
 from django.utils.safestring import mark_safe
+from django.utils.text import compress_string
 
+import turbo_helper.response
+import turbo_helper.stream
 from tests.test_tags import render
 from tests.utils import assert_dom_equal
-from turbo_helper import turbo_stream
+from turbo_helper import register_turbo_stream_action, turbo_stream
 from turbo_helper.constants import TURBO_STREAM_MIME_TYPE
+from turbo_helper.stream import action_proxy
 
 
 class TestTurboStream:
@@ -15,6 +33,20 @@ class TestTurboStream:
             == '<turbo-stream action="append" target="dom_id"><template>OK</template></turbo-stream>'
         )
 
+    def test_render_attributes(self):
+        s = turbo_stream.append(
+            "dom_id",
+            "OK",
+            data_delay_value=3000,
+            data_dismissible=True,
+            title=mark_safe('"Saved" <draft>'),
+            request_id=None,
+        )
+        assert (
+            s
+            == '<turbo-stream action="append" target="dom_id" data-delay-value="3000" data-dismissible="True" title="&quot;Saved&quot; &lt;draft&gt;"><template>OK</template></turbo-stream>'
+        )
+
     def test_render_escape_behavior(self):
         s = turbo_stream.append("dom_id", "<script></script>")
         assert (
@@ -64,6 +96,29 @@ class TestTurboStream:
         assert "my content" in s
         assert '<turbo-stream action="append" targets=".old_records">' in s
 
+    def test_template_cache(self, monkeypatch, settings):
+        mock_get_template = mock.MagicMock(
+            name="get_template", side_effect=turbo_helper.stream.get_template
+        )
+        monkeypatch.setattr(turbo_helper.stream, "get_template", mock_get_template)
+        turbo_stream.clear_template_cache()
+
+        for i in range(3):
+            s = turbo_stream.append(
+                "dom_id", template="simple.html", context={"msg": f"content {i}"}
+            )
+            assert f"content {i}" in s
+        assert mock_get_template.call_count == 1
+
+        # template files changed
+        file_changed.send(sender=None, file_path=Path("simple.html"))
+        turbo_stream.append("dom_id", template="simple.html", context={"msg": ""})
+        assert mock_get_template.call_count == 2
+
+        settings.TEMPLATES = settings.TEMPLATES
+        turbo_stream.append("dom_id", template="simple.html", context={"msg": ""})
+        assert mock_get_template.call_count == 3
+
     def test_custom_register(self, register_toast_action):
         s = turbo_stream.toast("dom_id", message="hello world", position="right")
         assert (
@@ -101,6 +156,312 @@ class TestTurboStream:
             in response.content.decode("utf-8")
         )
 
+    def test_response_list(self):
+        response = turbo_stream.response(
+            [
+                turbo_stream.append("dom_id", "OK"),
+                turbo_stream.update("dom_id_2", "café"),
+            ]
+        )
+
+        assert response.headers["content-type"] == TURBO_STREAM_MIME_TYPE
+        assert response.content == (
+            '<turbo-stream action="append" target="dom_id"><template>OK</template></turbo-stream>'
+            '<turbo-stream action="update" target="dom_id_2"><template>café</template></turbo-stream>'
+        ).encode("utf-8")
+
+
+class TestActions:
+    def test_metadata(self):
+        append = turbo_stream.actions["append"]
+        assert append.single is turbo_helper.stream.append
+        assert append.all is turbo_helper.stream.append_all
+        assert append.content
+        assert append.targets
+
+        assert not turbo_stream.actions["remove"].content
+
+        # turbo_power action which only handles targets
+        graft = turbo_stream.actions["graft"]
+        assert graft.all is graft.single
+        assert graft.targets
+
+        assert turbo_stream.is_registered("append_all")
+
+    def test_action_proxy(self):
+        assert_dom_equal(
+            action_proxy("append", targets=".test", content="OK"),
+            '<turbo-stream action="append" targets=".test"><template>OK</template></turbo-stream>',
+        )
+        assert_dom_equal(
+            action_proxy("graft", targets="#input", parent="#parent"),
+            '<turbo-stream action="graft" targets="#input" parent="#parent"><template></template></turbo-stream>',
+        )
+
+        with pytest.raises(AttributeError):
+            action_proxy("unknown", target="test")
+
+    def test_register(self, register_toast_action):
+        assert turbo_stream.is_registered("toast")
+        assert "toast" in turbo_stream.actions
+
+        with pytest.raises(AttributeError):
+            register_turbo_stream_action("toast")(lambda target, **kwargs: "")
+
+    def test_register_updates_one_entry(self):
+        append = turbo_stream.actions["append"]
+
+        turbo_stream.register("append_twice", lambda target, content=None: "")
+        try:
+            assert "append_twice" in turbo_stream.registered_actions
+            # other entries are kept as they are
+            assert turbo_stream.actions["append"] is append
+            assert turbo_stream.actions["append_twice"].single
+
+            turbo_stream.register("append_twice_all", lambda targets, content=None: "")
+            assert turbo_stream.actions["append_twice"].all
+            assert "append_twice_all" in turbo_stream.actions
+
+            turbo_stream.unregister("append_twice_all")
+            append_twice = turbo_stream.actions["append_twice"]
+            assert append_twice.all is append_twice.single
+            assert "append_twice_all" not in turbo_stream.actions
+        finally:
+            turbo_stream.unregister("append_twice")
+
+        assert "append_twice" not in turbo_stream.actions
+        assert "append_twice" not in turbo_stream.registered_actions
+        assert turbo_stream.actions["append"] is append
+
+
+class TestStreamTemplate:
+    context = {
+        "instances": [{"description": "a"}, {"description": "b"}],
+    }
+    # each iteration of the loop is sent by itself
+    expected = [
+        '<turbo-stream action="append" target="todo_list"><template><div>a</div></template></turbo-stream>',
+        '<turbo-stream action="append" target="todo_list"><template><div>b</div></template></turbo-stream>',
+        '<turbo-stream action="update" target="todo_count"><template>2</template></turbo-stream>',
+    ]
+
+    def test_stream_template(self, rf):
+        response = turbo_stream.streaming_response(
+            "todoitems.turbo_stream.html", self.context, rf.get("/")
+        )
+
+        assert response.headers["content-type"] == TURBO_STREAM_MIME_TYPE
+        assert not response.is_async
+        assert [chunk.decode() for chunk in response.streaming_content] == (
+            self.expected
+        )
+
+    def test_same_as_render(self):
+        template = engines["django"].from_string(
+            "{% for a, b in pairs reversed %}{{ forloop.counter }}{{ a }}{{ b }}"
+            "{% for c in a %}{{ forloop.parentloop.first }}{{ c }}{% endfor %}"
+            "{% empty %}empty{% endfor %}{% for x in empty %}{% empty %}none{% endfor %}"
+        )
+        context = {"pairs": [("xy", 1), ("z", 2)], "empty": []}
+        with mock.patch.object(turbo_stream, "get_template", return_value=template):
+            chunks = list(turbo_stream.stream_template("loop.html", context))
+
+        assert "".join(chunks) == template.render(context)
+        assert chunks[0] == "1"
+
+    @pytest.mark.asyncio
+    async def test_astream_template(self):
+        request = AsyncRequestFactory().get("/")
+        response = turbo_stream.streaming_response(
+            "todoitems.turbo_stream.html", self.context, request
+        )
+
+        assert response.is_async
+        assert [
+            chunk.decode() async for chunk in response.streaming_content
+        ] == self.expected
+
+
+class ConcurrentBlock:
+    """
+    value() returns only when the other block is being rendered at the same time
+    """
+
+    def __init__(self, value, barrier):
+        self._value = value
+        self.barrier = barrier
+        self.thread = None
+
+    def value(self):
+        self.thread = threading.get_ident()
+        if self.barrier:
+            self.barrier.wait()
+        return self._value
+
+
+class TestRenderParallel:
+    def test_render_parallel(self):
+        barrier = threading.Barrier(2, timeout=5)
+        context = {
+            "first": ConcurrentBlock("a", barrier),
+            "second": ConcurrentBlock("b", barrier),
+        }
+
+        output = turbo_stream.render_template(
+            "parallel.turbo_stream.html", context, parallel=True
+        )
+
+        assert output == turbo_stream.render_template(
+            "parallel.turbo_stream.html",
+            {"first": {"value": "a"}, "second": {"value": "b"}},
+        )
+        assert output.startswith(
+            '<turbo-stream action="update" target="first"><template>a</template>'
+        )
+        assert not barrier.broken
+        assert context["first"].thread != context["second"].thread
+        assert threading.get_ident() not in (
+            context["first"].thread,
+            context["second"].thread,
+        )
+
+    @pytest.mark.django_db
+    def test_render_serial_in_atomic_block(self):
+        context = {
+            "first": ConcurrentBlock("a", None),
+            "second": ConcurrentBlock("b", None),
+        }
+        with transaction.atomic():
+            turbo_stream.render_template(
+                "parallel.turbo_stream.html", context, parallel=True
+            )
+
+        # rendered with the connection of the transaction
+        assert context["first"].thread == threading.get_ident()
+        assert context["second"].thread == threading.get_ident()
+
+
+class TestCompile:
+    def test_compile(self):
+        dispatch_event = turbo_stream.compile(
+            "dispatch_event", keys=["name"], targets=True, detail={"id": 42}
+        )
+        assert dispatch_event("#project", "project:saved") == (
+            turbo_stream.dispatch_event(
+                targets="#project", name="project:saved", detail={"id": 42}
+            )
+        )
+
+        update = turbo_stream.compile("update", keys=["data_count"])
+        assert update("counter", 3, content="<b>") == turbo_stream.update(
+            "counter", "<b>", data_count=3
+        )
+        assert update("counter", None) == turbo_stream.update("counter", None)
+
+        replace = turbo_stream.compile("replace", method="morph")
+        assert replace("counter", content="1") == turbo_stream.replace(
+            "counter", "1", method="morph"
+        )
+
+    def test_compile_turbo_power(self):
+        redirect_to = turbo_stream.compile(
+            "redirect_to", keys=["url", "turbo_frame", "data_toast_value"]
+        )
+
+        for values in [
+            ("/projects/?a=1&b=2", "main", "x"),
+            ("/projects/", None, None),
+            # transformed by the handler
+            ("/projects/", "main", True),
+            ("/projects/", "main", {"a": 1}),
+        ]:
+            url, turbo_frame, data_toast_value = values
+            # turbo_action="advance" of the handler, keys are dashed by turbo_power
+            assert redirect_to(None, *values) == turbo_stream.redirect_to(
+                url, turbo_frame=turbo_frame, data_toast_value=data_toast_value
+            )
+
+    def test_invalid(self):
+        with pytest.raises(AttributeError):
+            turbo_stream.compile("unknown")
+
+        with pytest.raises(ValueError):
+            turbo_stream.compile("notification", targets=True)
+
+        # rendered in the content, not as an attribute
+        with pytest.raises(ValueError):
+            turbo_stream.compile("dispatch_event", keys=["detail"], targets=True)
+
+        update = turbo_stream.compile("update", keys=["title"])
+        with pytest.raises(TypeError):
+            update("counter")
+
+        remove = turbo_stream.compile("remove")
+        with pytest.raises(TypeError):
+            remove("counter", content="OK")
+
+
+class TestPrecompress:
+    @pytest.fixture(autouse=True)
+    def setup(self, monkeypatch):
+        monkeypatch.setattr(turbo_helper.response, "brotli", None)
+        turbo_helper.response.get_compressed_content_cache().clear()
+
+    def test_gzip(self, rf, monkeypatch):
+        mock_compress = mock.MagicMock(
+            name="compress_string", side_effect=compress_string
+        )
+        monkeypatch.setattr(turbo_helper.response, "compress_string", mock_compress)
+        content = turbo_stream.update("nav", "x" * 500)
+        request = rf.get("/", HTTP_ACCEPT_ENCODING="gzip, deflate")
+
+        for _ in range(2):
+            response = turbo_stream.response(content, request=request, precompress=True)
+            assert response.headers["Content-Encoding"] == "gzip"
+            assert response.headers["Vary"] == "Accept-Encoding"
+            assert gzip.decompress(response.content) == content.encode("utf-8")
+
+        assert mock_compress.call_count == 1
+
+        # GZipMiddleware does not compress it again
+        middleware = GZipMiddleware(lambda request: response)
+        assert middleware(request).content == response.content
+
+    def test_not_compressed(self, rf):
+        content = turbo_stream.update("nav", "x" * 500)
+
+        response = turbo_stream.response(content, request=rf.get("/"), precompress=True)
+        assert "Content-Encoding" not in response.headers
+        assert response.content == content.encode("utf-8")
+
+        # small payload
+        response = turbo_stream.response(
+            "OK",
+            request=rf.get("/", HTTP_ACCEPT_ENCODING="gzip"),
+            precompress=True,
+        )
+        assert "Content-Encoding" not in response.headers
+
+    def test_cache_size(self, settings):
+        settings.TURBO_HELPER_COMPRESSED_RESPONSE_CACHE_SIZE = 1
+        cache = turbo_helper.response.get_compressed_content_cache()
+        assert cache.max_size == 1
+
+        cache.get("gzip", b"a" * 300)
+        cache.get("gzip", b"b" * 300)
+        assert len(cache.cache) == 1
+
+    def test_import_without_settings(self):
+        # settings are read when the cache is used
+        env = {
+            key: value
+            for key, value in os.environ.items()
+            if key != "DJANGO_SETTINGS_MODULE"
+        }
+        subprocess.run(
+            [sys.executable, "-c", "import turbo_helper"], env=env, check=True
+        )
+
 
 class TestMorphMethod:
     def test_update_morph_method(self):
@@ -117,6 +478,19 @@ class TestMorphMethod:
             turbo_stream.replace("#input", mark_safe("<p>Morph</p>"), method="morph"),
         )
 
+    def test_replace_all_morph_method(self):
+        stream = '<turbo-stream targets=".items" action="replace" method="morph"><template><p>Morph</p></template></turbo-stream>'
+        assert_dom_equal(
+            stream,
+            turbo_stream.replace_all(
+                ".items", mark_safe("<p>Morph</p>"), method="morph"
+            ),
+        )
+
+    def test_invalid_method(self):
+        with pytest.raises(ValueError):
+            turbo_stream.update("#input", "test", method="replace")
+
     def test_tag(self, register_toast_action):
         template = """
         {% load turbo_helper %}
@@ -1,8 +1,17 @@
+from unittest import mock
+
 import pytest
+from django.core.cache import cache
 from django.template import Context, Template
 
 from tests.testapp.models import TodoItem
 from tests.utils import assert_dom_equal
+from turbo_helper.channels.stream_name import (
+    generate_signed_stream_key,
+    generate_signed_stream_names_key,
+    verify_signed_stream_names_key,
+    verify_stream_names_from,
+)
 from turbo_helper.templatetags.turbo_helper import dom_id
 
 pytestmark = pytest.mark.django_db
@@ -120,6 +129,91 @@ class TestFrame:
         )
 
 
+class Item:
+    def __init__(self, pk, version):
+        self.pk = pk
+        self.version = version
+        self.render_count = 0
+
+    def body(self):
+        self.render_count += 1
+        return f"item {self.pk}"
+
+
+class TestFrameCache:
+    @pytest.fixture(autouse=True)
+    def clear_cache(self):
+        cache.clear()
+
+    def test_cache(self):
+        template = """{% load turbo_helper %}{% turbo_frame frame_id src="/test/" cache=item.version %}{{ item.body }}{% endturbo_frame %}"""
+        item = Item(1, "v1")
+
+        for _ in range(2):
+            output = render(template, {"frame_id": "item_1", "item": item})
+            assert (
+                output == '<turbo-frame id="item_1" src="/test/">item 1</turbo-frame>'
+            )
+        assert item.render_count == 1
+
+        # new version
+        item.version = "v2"
+        render(template, {"frame_id": "item_1", "item": item})
+        assert item.render_count == 2
+
+    def test_cache_version_none(self):
+        template = """{% load turbo_helper %}{% turbo_frame "item_1" cache=item.version %}{{ item.body }}{% endturbo_frame %}"""
+        item = Item(1, None)
+
+        for _ in range(2):
+            render(template, {"item": item})
+        assert item.render_count == 2
+
+    def test_cache_many(self, monkeypatch):
+        template = """{% load turbo_helper %}{% turbo_frame_cache %}{{ header.body }}{% for item in items %}{% cycle "a" "b" as css silent %}{% turbo_frame item.pk class=css cache=item.version %}{{ item.body }}{% endturbo_frame %}{% endfor %}{% endturbo_frame_cache %}"""
+        header = Item("header", None)
+        items = [Item(i, "v1") for i in range(3)]
+        expected = "item header" + "".join(
+            f'<turbo-frame id="{i}" class="{css}">item {i}</turbo-frame>'
+            for i, css in enumerate("aba")
+        )
+
+        assert render(template, {"header": header, "items": items}) == expected
+        assert [item.render_count for item in items] == [1, 1, 1]
+        # the content outside the frames is rendered once
+        assert header.render_count == 1
+
+        original_get = cache.get
+        mock_get = mock.MagicMock(name="get", side_effect=original_get)
+        mock_get_many = mock.MagicMock(
+            name="get_many",
+            side_effect=lambda keys: {key: original_get(key) for key in keys},
+        )
+        monkeypatch.setattr(cache, "get", mock_get)
+        monkeypatch.setattr(cache, "get_many", mock_get_many)
+
+        items[1].version = "v2"
+        assert render(template, {"header": header, "items": items}) == expected
+        assert [item.render_count for item in items] == [1, 2, 1]
+        assert header.render_count == 2
+        assert mock_get_many.call_count == 1
+        assert len(mock_get_many.call_args.args[0]) == 3
+        assert mock_get.call_count == 0
+
+    def test_cache_many_forloop(self):
+        # the frames are rendered after the loop, with the forloop of their iteration
+        template = """{% load turbo_helper %}{% turbo_frame_cache %}{% for group in groups %}{% for item in group %}{% turbo_frame item cache=None %}{{ forloop.parentloop.counter }}.{{ forloop.counter }}:{{ item }}{% endturbo_frame %}{% endfor %}{% endfor %}{% endturbo_frame_cache %}"""
+        expected = "".join(
+            f'<turbo-frame id="{item}">{text}</turbo-frame>'
+            for item, text in [("a", "1.1:a"), ("b", "1.2:b"), ("c", "2.1:c")]
+        )
+        assert render(template, {"groups": [["a", "b"], ["c"]]}) == expected
+
+        cache.clear()
+        template = template.replace("cache=None", "cache=1")
+        assert render(template, {"groups": [["a", "b"], ["c"]]}) == expected
+
+
 class TestStream:
     def test_string(self):
         template = """
@@ -208,3 +302,86 @@ class TestStreamFrom:
             output
             == '<turbo-cable-stream-source channel="TurboStreamCableChannel" signed-stream-name="test_todo_3:7ZS0MxQWhRTCAnG3olGO9AJKfvos3iaHGoBMBt8ZbSM"></turbo-cable-stream-source>'
         )
+
+    def test_prefix(self):
+        template = """
+        {% load turbo_helper %}
+
+        {% turbo_stream_from "project" dom_id prefix=True %}
+        """
+        output = render(template, {"dom_id": "todo_3"}).strip()
+        signed_stream_prefix = generate_signed_stream_key(
+            "project_todo_3_*", prefix=True
+        )
+        assert (
+            output
+            == f'<turbo-cable-stream-source channel="TurboStreamCableChannel" data-signed-stream-prefix="{signed_stream_prefix}"></turbo-cable-stream-source>'
+        )
+        assert verify_stream_names_from(
+            {"signed_stream_prefix": signed_stream_prefix}
+        ) == ["project_todo_3_*"]
+
+    def test_prefix_from_stream_name(self):
+        # a stream name ending with "_*" is not a prefix subscription
+        output = render(
+            '{% load turbo_helper %}{% turbo_stream_from "project" 42 value %}',
+            {"value": "*"},
+        )
+        signed_stream_name = generate_signed_stream_key("project_42_*")
+        assert signed_stream_name in output
+        assert (
+            verify_stream_names_from({"signed_stream_name": signed_stream_name}) == []
+        )
+        assert (
+            verify_stream_names_from({"signed_stream_prefix": signed_stream_name}) == []
+        )
+        assert (
+            verify_stream_names_from(
+                {
+                    "signed_stream_prefixes": generate_signed_stream_names_key(
+                        ["project_42_*"]
+                    )
+                }
+            )
+            == []
+        )
+
+    def test_multiple_prefixes(self):
+        output = render(
+            '{% load turbo_helper %}{% turbo_streams_from "project" "team" prefix=True %}',
+            {},
+        )
+        signed_stream_prefixes = generate_signed_stream_names_key(
+            ["project_*", "team_*"], prefix=True
+        )
+        assert f'data-signed-stream-prefixes="{signed_stream_prefixes}"' in output
+        assert verify_stream_names_from(
+            {"signed_stream_prefixes": signed_stream_prefixes}
+        ) == ["project_*", "team_*"]
+
+    def test_multiple_streams(self):
+        template = """
+        {% load turbo_helper %}
+
+        {% turbo_streams_from "announcements" chat_stream %}
+        """
+        output = render(template, {"chat_stream": ["chat", "todo_3"]}).strip()
+        signed_stream_names = generate_signed_stream_names_key(
+            ["announcements", "chat_todo_3"]
+        )
+        assert (
+            output
+            == f'<turbo-cable-stream-source channel="TurboStreamCableChannel" data-signed-stream-names="{signed_stream_names}"></turbo-cable-stream-source>'
+        )
+        assert verify_signed_stream_names_key(signed_stream_names) == (
+            True,
+            ["announcements", "chat_todo_3"],
+        )
+
+    def test_verify_single_key_as_names_key(self):
+        # a signed stream name is not a valid signed list of stream names
+        for stream_name in ["chat", "e30", "WyJhIl0"]:
+            assert verify_signed_stream_names_key(
+                generate_signed_stream_key(stream_name)
+            ) == (False, [])
+        assert verify_signed_stream_names_key("invalid") == (False, [])
@@ -1,9 +1,13 @@
 # Django
 from django.db import models
 
+from turbo_helper.signals import BulkSignalQuerySet
+
 
 class TodoItem(models.Model):
     description = models.TextField()
 
+    objects = BulkSignalQuerySet.as_manager()
+
     def get_absolute_url(self):
         return f"/todos/{self.id}/"
@@ -2,9 +2,14 @@
 from django.http import HttpResponse
 from django.urls import path
 
+from turbo_helper.channels.sse import turbo_stream_sse_view
+
 
 def index(request):
     return HttpResponse("OK")
 
 
-urlpatterns = [path("", index, name="index")]
+urlpatterns = [
+    path("", index, name="index"),
+    path("turbo-streams/", turbo_stream_sse_view, name="turbo_stream_sse"),
+]